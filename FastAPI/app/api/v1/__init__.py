@@ -1,6 +1,11 @@
 from fastapi import APIRouter
 
-from app.api.v1 import auth, links
+from app.config import settings
+
+if settings.async_endpoints:
+    from app.api.v1 import async_auth as auth, async_links as links
+else:
+    from app.api.v1 import auth, links
 
 api_router = APIRouter()
 api_router.include_router(auth.router, prefix='/auth', tags=['auth'])
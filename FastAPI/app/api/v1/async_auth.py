@@ -0,0 +1,31 @@
+from fastapi import APIRouter, Depends, HTTPException, status
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.core.database import get_async_db
+from app.core.security import create_access_token, password_hasher
+from app.schemas.user import UserCreate, UserLogin, UserResponse, Token
+from app.services import AsyncUserService
+
+router = APIRouter()
+
+
+@router.post('/register', response_model=UserResponse)
+async def register(data: UserCreate, db: AsyncSession = Depends(get_async_db)):
+    svc = AsyncUserService(db)
+    if await svc.get_by_email(data.email):
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail='Email already registered')
+    user = await svc.create(data)
+    return user
+
+
+@router.post('/login', response_model=Token)
+async def login(data: UserLogin, db: AsyncSession = Depends(get_async_db)):
+    svc = AsyncUserService(db)
+    user = await svc.get_by_email(data.email)
+    if not user or not await password_hasher.verify_async(data.password, user.hashed_password):
+        raise HTTPException(
+            status_code=status.HTTP_401_UNAUTHORIZED,
+            detail='Incorrect email or password',
+        )
+    token = create_access_token(data={'sub': str(user.id)})
+    return Token(access_token=token)
@@ -0,0 +1,265 @@
+from datetime import datetime
+from typing import Literal, Optional
+
+from fastapi import APIRouter, BackgroundTasks, Depends, HTTPException, Query, status, Request
+from fastapi.responses import ORJSONResponse, RedirectResponse, Response, StreamingResponse
+from sqlalchemy.ext.asyncio import AsyncSession
+from starlette.background import BackgroundTask
+
+from app.config import settings
+from app.core.database import AsyncSessionLocal, get_async_db, get_async_read_db
+from app.core.rate_limit import rate_limit_async
+from app.core.security import Principal, get_current_user_optional_async, get_current_user_required_async
+from app.schemas.link import (
+    ArchivedLinkResponse,
+    LinkCreate,
+    LinkUpdate,
+    LinkResponse,
+    LinkStatsResponse,
+    LinkSearchResponse,
+    LinkTimeseriesResponse,
+)
+from app.services import AsyncLinkService
+from app.services.bulk_links import BulkTooLarge, iter_bulk_items, iter_spool, spool_results
+from app.services.link_queries import search_payload
+from app.services.link_service import track_click_async
+
+router = APIRouter()
+
+
+def _link_service(
+    request: Request, db: AsyncSession, read_db: Optional[AsyncSession] = None
+) -> AsyncLinkService:
+    base_url = str(request.base_url).rstrip('/')
+    return AsyncLinkService(db, base_url=base_url, read_db=read_db)
+
+
+@router.get(
+    '/search/',
+    response_model=list[LinkSearchResponse],
+    dependencies=[Depends(rate_limit_async('search'))],
+)
+async def search_by_url(
+    original_url: str,
+    request: Request,
+    db: AsyncSession = Depends(get_async_db),
+    read_db: Optional[AsyncSession] = Depends(get_async_read_db),
+):
+    svc = _link_service(request, db, read_db)
+    # The cached body is already the response: skip model validation and re-encoding.
+    body = await svc.search_by_original_url_json(original_url)
+    return Response(content=body, media_type='application/json')
+
+
+@router.get(
+    '/search/domain/',
+    response_model=list[LinkSearchResponse],
+    dependencies=[Depends(rate_limit_async('search'))],
+)
+async def search_by_domain(
+    domain: str,
+    request: Request,
+    limit: int = Query(100, ge=1, le=1000),
+    db: AsyncSession = Depends(get_async_db),
+    read_db: Optional[AsyncSession] = Depends(get_async_read_db),
+):
+    svc = _link_service(request, db, read_db)
+    links = await svc.search_by_domain(domain, limit=limit)
+    return ORJSONResponse([search_payload(l) for l in links])
+
+
+@router.get('/archive/{short_code}', response_model=ArchivedLinkResponse)
+async def archived_link(
+    short_code: str,
+    request: Request,
+    db: AsyncSession = Depends(get_async_db),
+    read_db: Optional[AsyncSession] = Depends(get_async_read_db),
+):
+    svc = _link_service(request, db, read_db)
+    archived = await svc.get_archived(short_code)
+    if not archived:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail='Archived link not found')
+    return ArchivedLinkResponse.model_validate(archived)
+
+
+@router.get(
+    '/archive/{short_code}/stats/timeseries',
+    response_model=LinkTimeseriesResponse,
+    response_model_exclude_none=True,
+)
+async def archived_link_timeseries(
+    short_code: str,
+    request: Request,
+    granularity: Literal['hour', 'day'] = 'hour',
+    start: Optional[datetime] = None,
+    end: Optional[datetime] = None,
+    group_by: Optional[Literal['referrer', 'country']] = None,
+    db: AsyncSession = Depends(get_async_db),
+    read_db: Optional[AsyncSession] = Depends(get_async_read_db),
+):
+    svc = _link_service(request, db, read_db)
+    try:
+        series = await svc.get_archived_timeseries(short_code, granularity, start, end, group_by)
+    except ValueError as e:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=str(e))
+    if not series:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail='Archived link not found')
+    return series
+
+
+@router.post('/shorten', response_model=LinkResponse, dependencies=[Depends(rate_limit_async('shorten'))])
+async def shorten(
+    data: LinkCreate,
+    request: Request,
+    db: AsyncSession = Depends(get_async_db),
+    current_user: Principal | None = Depends(get_current_user_optional_async),
+):
+    svc = _link_service(request, db)
+    try:
+        link = await svc.create(data, owner_id=current_user.id if current_user else None)
+    except ValueError as e:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=str(e))
+    base = str(request.base_url).rstrip('/')
+    short_url = f'{base}/api/v1/links/{link.short_code}'
+    return LinkResponse(
+        short_code=link.short_code,
+        original_url=link.original_url,
+        short_url=short_url,
+        created_at=link.created_at,
+        expires_at=link.expires_at,
+    )
+
+
+async def _bulk_items(request: Request):
+    length = request.headers.get('content-length')
+    if length and length.isdigit() and int(length) > settings.bulk_max_bytes:
+        raise HTTPException(
+            status_code=status.HTTP_413_REQUEST_ENTITY_TOO_LARGE,
+            detail=f'Body exceeds {settings.bulk_max_bytes} bytes',
+        )
+    ndjson = 'ndjson' in request.headers.get('content-type', '')
+    try:
+        return await iter_bulk_items(request.stream(), ndjson, settings.bulk_max_items, settings.bulk_max_bytes)
+    except BulkTooLarge as e:
+        raise HTTPException(status_code=status.HTTP_413_REQUEST_ENTITY_TOO_LARGE, detail=str(e))
+    except ValueError as e:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=str(e))
+
+
+@router.post('/shorten/bulk', dependencies=[Depends(rate_limit_async('bulk'))])
+async def shorten_bulk(
+    request: Request,
+    current_user: Principal | None = Depends(get_current_user_optional_async),
+):
+    items = await _bulk_items(request)
+    base = str(request.base_url).rstrip('/')
+    owner_id = current_user.id if current_user else None
+    async with AsyncSessionLocal() as db:
+        svc = AsyncLinkService(db, base_url=base)
+        spool = await spool_results(
+            items, settings.bulk_batch_size, lambda batch: svc.create_many(batch, owner_id=owner_id)
+        )
+    return StreamingResponse(
+        iter_spool(spool), media_type='application/x-ndjson', background=BackgroundTask(spool.close)
+    )
+
+
+@router.get('/{short_code}/stats', response_model=LinkStatsResponse)
+async def link_stats(
+    short_code: str,
+    request: Request,
+    db: AsyncSession = Depends(get_async_db),
+    read_db: Optional[AsyncSession] = Depends(get_async_read_db),
+):
+    svc = _link_service(request, db, read_db)
+    stats = await svc.get_stats(short_code)
+    if not stats:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail='Link not found or expired')
+    return ORJSONResponse(stats.to_payload())
+
+
+@router.get(
+    '/{short_code}/stats/timeseries',
+    response_model=LinkTimeseriesResponse,
+    response_model_exclude_none=True,
+)
+async def link_timeseries(
+    short_code: str,
+    request: Request,
+    granularity: Literal['hour', 'day'] = 'hour',
+    start: Optional[datetime] = None,
+    end: Optional[datetime] = None,
+    group_by: Optional[Literal['referrer', 'country']] = None,
+    db: AsyncSession = Depends(get_async_db),
+    read_db: Optional[AsyncSession] = Depends(get_async_read_db),
+):
+    svc = _link_service(request, db, read_db)
+    try:
+        series = await svc.get_timeseries(short_code, granularity, start, end, group_by)
+    except ValueError as e:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=str(e))
+    if not series:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail='Link not found or expired')
+    return series
+
+
+@router.get(
+    '/{short_code}',
+    status_code=status.HTTP_307_TEMPORARY_REDIRECT,
+    dependencies=[Depends(rate_limit_async('redirect'))],
+)
+async def redirect_to_original(
+    short_code: str,
+    request: Request,
+    background_tasks: BackgroundTasks,
+    db: AsyncSession = Depends(get_async_db),
+    read_db: Optional[AsyncSession] = Depends(get_async_read_db),
+):
+    svc = _link_service(request, db, read_db)
+    referrer = request.headers.get('referer')
+    country = request.headers.get(settings.click_country_header)
+    if settings.redirect_cache_first:
+        url = await svc.resolve_cached(short_code)
+        if url:
+            background_tasks.add_task(track_click_async, short_code, referrer, country)
+    else:
+        url = await svc.resolve_and_track(short_code, referrer, country)
+    if not url:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail='Link not found or expired')
+    return RedirectResponse(url=url, status_code=307)
+
+
+@router.delete('/{short_code}', status_code=status.HTTP_204_NO_CONTENT)
+async def delete_link(
+    short_code: str,
+    request: Request,
+    db: AsyncSession = Depends(get_async_db),
+    current_user: Principal = Depends(get_current_user_required_async),
+):
+    svc = _link_service(request, db)
+    if not await svc.delete(short_code, owner_id=current_user.id):
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail='Link not found or access denied')
+    return None
+
+
+@router.put('/{short_code}', response_model=LinkResponse)
+async def update_link(
+    short_code: str,
+    data: LinkUpdate,
+    request: Request,
+    db: AsyncSession = Depends(get_async_db),
+    current_user: Principal = Depends(get_current_user_required_async),
+):
+    svc = _link_service(request, db)
+    link = await svc.update(short_code, data, owner_id=current_user.id)
+    if not link:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail='Link not found or access denied')
+    base = str(request.base_url).rstrip('/')
+    short_url = f'{base}/api/v1/links/{link.short_code}'
+    return LinkResponse(
+        short_code=link.short_code,
+        original_url=link.original_url,
+        short_url=short_url,
+        created_at=link.created_at,
+        expires_at=link.expires_at,
+    )
@@ -2,7 +2,7 @@ from fastapi import APIRouter, Depends, HTTPException, status
 from sqlalchemy.orm import Session
 
 from app.core.database import get_db
-from app.core.security import verify_password, create_access_token
+from app.core.security import create_access_token, password_hasher
 from app.schemas.user import UserCreate, UserLogin, UserResponse, Token
 from app.services import UserService
 
@@ -22,7 +22,7 @@ def register(data: UserCreate, db: Session = Depends(get_db)):
 def login(data: UserLogin, db: Session = Depends(get_db)):
     svc = UserService(db)
     user = svc.get_by_email(data.email)
-    if not user or not verify_password(data.password, user.hashed_password):
+    if not user or not password_hasher.verify(data.password, user.hashed_password):
         raise HTTPException(
             status_code=status.HTTP_401_UNAUTHORIZED,
             detail='Incorrect email or password',
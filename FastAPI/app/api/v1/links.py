@@ -1,46 +1,117 @@
-from fastapi import APIRouter, Depends, HTTPException, status, Request
-from fastapi.responses import RedirectResponse
+from datetime import datetime
+from typing import Literal, Optional
+
+from fastapi import APIRouter, BackgroundTasks, Depends, HTTPException, Query, status, Request
+from fastapi.responses import ORJSONResponse, RedirectResponse, Response, StreamingResponse
 from sqlalchemy.orm import Session
+from starlette.background import BackgroundTask
+from starlette.concurrency import run_in_threadpool
 
-from app.core.database import get_db
-from app.core.security import get_current_user_optional, get_current_user_required
-from app.models.user import User
-from app.schemas.link import LinkCreate, LinkUpdate, LinkResponse, LinkStatsResponse, LinkSearchResponse
+from app.config import settings
+from app.core.database import SessionLocal, get_db, get_read_db
+from app.core.rate_limit import rate_limit
+from app.core.security import Principal, get_current_user_optional, get_current_user_required
+from app.schemas.link import (
+    ArchivedLinkResponse,
+    LinkCreate,
+    LinkUpdate,
+    LinkResponse,
+    LinkStatsResponse,
+    LinkSearchResponse,
+    LinkTimeseriesResponse,
+)
 from app.services import LinkService, UserService
+from app.services.bulk_links import BulkTooLarge, iter_bulk_items, iter_spool, spool_results
+from app.services.link_queries import search_payload
+from app.services.link_service import track_click
 
 router = APIRouter()
 
 
-def _link_service(request: Request, db: Session = Depends(get_db)) -> LinkService:
+def _link_service(
+    request: Request,
+    db: Session = Depends(get_db),
+    read_db: Optional[Session] = None,
+) -> LinkService:
     base_url = str(request.base_url).rstrip('/')
-    return LinkService(db, base_url=base_url)
+    return LinkService(db, base_url=base_url, read_db=read_db)
 
 
-@router.get('/search/', response_model=list[LinkSearchResponse])
+@router.get('/search/', response_model=list[LinkSearchResponse], dependencies=[Depends(rate_limit('search'))])
 def search_by_url(
     original_url: str,
     request: Request,
     db: Session = Depends(get_db),
+    read_db: Optional[Session] = Depends(get_read_db),
 ):
-    svc = _link_service(request, db)
-    links = svc.search_by_original_url(original_url)
-    return [
-        LinkSearchResponse(
-            short_code=l.short_code,
-            original_url=l.original_url,
-            created_at=l.created_at,
-            expires_at=l.expires_at,
-        )
-        for l in links
-    ]
+    svc = _link_service(request, db, read_db)
+    # The cached body is already the response: skip model validation and re-encoding.
+    body = svc.search_by_original_url_json(original_url)
+    return Response(content=body, media_type='application/json')
+
 
+@router.get(
+    '/search/domain/',
+    response_model=list[LinkSearchResponse],
+    dependencies=[Depends(rate_limit('search'))],
+)
+def search_by_domain(
+    domain: str,
+    request: Request,
+    limit: int = Query(100, ge=1, le=1000),
+    db: Session = Depends(get_db),
+    read_db: Optional[Session] = Depends(get_read_db),
+):
+    svc = _link_service(request, db, read_db)
+    links = svc.search_by_domain(domain, limit=limit)
+    return ORJSONResponse([search_payload(l) for l in links])
+
+
+@router.get('/archive/{short_code}', response_model=ArchivedLinkResponse)
+def archived_link(
+    short_code: str,
+    request: Request,
+    db: Session = Depends(get_db),
+    read_db: Optional[Session] = Depends(get_read_db),
+):
+    svc = _link_service(request, db, read_db)
+    archived = svc.get_archived(short_code)
+    if not archived:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail='Archived link not found')
+    return ArchivedLinkResponse.model_validate(archived)
 
-@router.post('/shorten', response_model=LinkResponse)
+
+@router.get(
+    '/archive/{short_code}/stats/timeseries',
+    response_model=LinkTimeseriesResponse,
+    response_model_exclude_none=True,
+)
+def archived_link_timeseries(
+    short_code: str,
+    request: Request,
+    granularity: Literal['hour', 'day'] = 'hour',
+    start: Optional[datetime] = None,
+    end: Optional[datetime] = None,
+    group_by: Optional[Literal['referrer', 'country']] = None,
+    db: Session = Depends(get_db),
+    read_db: Optional[Session] = Depends(get_read_db),
+):
+    svc = _link_service(request, db, read_db)
+    try:
+        series = svc.get_archived_timeseries(short_code, granularity, start, end, group_by)
+    except ValueError as e:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=str(e))
+    if not series:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail='Archived link not found')
+    return series
+
+
+@router.post('/shorten', response_model=LinkResponse, dependencies=[Depends(rate_limit('shorten'))])
 def shorten(
     data: LinkCreate,
     request: Request,
     db: Session = Depends(get_db),
-    current_user: User | None = Depends(get_current_user_optional),
+    current_user: Principal | None = Depends(get_current_user_optional),
 ):
     svc = _link_service(request, db)
     try:
@@ -58,34 +129,105 @@ def shorten(
     )
 
 
+async def _bulk_items(request: Request):
+    length = request.headers.get('content-length')
+    if length and length.isdigit() and int(length) > settings.bulk_max_bytes:
+        raise HTTPException(
+            status_code=status.HTTP_413_REQUEST_ENTITY_TOO_LARGE,
+            detail=f'Body exceeds {settings.bulk_max_bytes} bytes',
+        )
+    ndjson = 'ndjson' in request.headers.get('content-type', '')
+    try:
+        return await iter_bulk_items(request.stream(), ndjson, settings.bulk_max_items, settings.bulk_max_bytes)
+    except BulkTooLarge as e:
+        raise HTTPException(status_code=status.HTTP_413_REQUEST_ENTITY_TOO_LARGE, detail=str(e))
+    except ValueError as e:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=str(e))
+
+
+@router.post('/shorten/bulk', dependencies=[Depends(rate_limit('bulk'))])
+async def shorten_bulk(
+    request: Request,
+    current_user: Principal | None = Depends(get_current_user_optional),
+):
+    items = await _bulk_items(request)
+    base = str(request.base_url).rstrip('/')
+    owner_id = current_user.id if current_user else None
+    db = SessionLocal()
+    try:
+        svc = LinkService(db, base_url=base)
+        spool = await spool_results(
+            items,
+            settings.bulk_batch_size,
+            lambda batch: run_in_threadpool(svc.create_many, batch, owner_id=owner_id),
+        )
+    finally:
+        await run_in_threadpool(db.close)
+    return StreamingResponse(
+        iter_spool(spool), media_type='application/x-ndjson', background=BackgroundTask(spool.close)
+    )
+
+
 @router.get('/{short_code}/stats', response_model=LinkStatsResponse)
 def link_stats(
     short_code: str,
     request: Request,
     db: Session = Depends(get_db),
+    read_db: Optional[Session] = Depends(get_read_db),
 ):
-    svc = _link_service(request, db)
-    link = svc.get_stats(short_code)
-    if not link:
+    svc = _link_service(request, db, read_db)
+    stats = svc.get_stats(short_code)
+    if not stats:
         raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail='Link not found or expired')
-    return LinkStatsResponse(
-        short_code=link.short_code,
-        original_url=link.original_url,
-        created_at=link.created_at,
-        click_count=link.click_count,
-        last_clicked_at=link.last_clicked_at,
-        expires_at=link.expires_at,
-    )
+    return ORJSONResponse(stats.to_payload())
+
+
+@router.get(
+    '/{short_code}/stats/timeseries',
+    response_model=LinkTimeseriesResponse,
+    response_model_exclude_none=True,
+)
+def link_timeseries(
+    short_code: str,
+    request: Request,
+    granularity: Literal['hour', 'day'] = 'hour',
+    start: Optional[datetime] = None,
+    end: Optional[datetime] = None,
+    group_by: Optional[Literal['referrer', 'country']] = None,
+    db: Session = Depends(get_db),
+    read_db: Optional[Session] = Depends(get_read_db),
+):
+    svc = _link_service(request, db, read_db)
+    try:
+        series = svc.get_timeseries(short_code, granularity, start, end, group_by)
+    except ValueError as e:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=str(e))
+    if not series:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail='Link not found or expired')
+    return series
 
 
-@router.get('/{short_code}', status_code=status.HTTP_307_TEMPORARY_REDIRECT)
+@router.get(
+    '/{short_code}',
+    status_code=status.HTTP_307_TEMPORARY_REDIRECT,
+    dependencies=[Depends(rate_limit('redirect'))],
+)
 def redirect_to_original(
     short_code: str,
     request: Request,
+    background_tasks: BackgroundTasks,
     db: Session = Depends(get_db),
+    read_db: Optional[Session] = Depends(get_read_db),
 ):
-    svc = _link_service(request, db)
-    url = svc.resolve_and_track(short_code)
+    svc = _link_service(request, db, read_db)
+    referrer = request.headers.get('referer')
+    country = request.headers.get(settings.click_country_header)
+    if settings.redirect_cache_first:
+        url = svc.resolve_cached(short_code)
+        if url:
+            background_tasks.add_task(track_click, short_code, referrer, country)
+    else:
+        url = svc.resolve_and_track(short_code, referrer, country)
     if not url:
         raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail='Link not found or expired')
     return RedirectResponse(url=url, status_code=307)
@@ -96,7 +238,7 @@ def delete_link(
     short_code: str,
     request: Request,
     db: Session = Depends(get_db),
-    current_user: User = Depends(get_current_user_required),
+    current_user: Principal = Depends(get_current_user_required),
 ):
     svc = _link_service(request, db)
     if not svc.delete(short_code, owner_id=current_user.id):
@@ -110,7 +252,7 @@ def update_link(
     data: LinkUpdate,
     request: Request,
     db: Session = Depends(get_db),
-    current_user: User = Depends(get_current_user_required),
+    current_user: Principal = Depends(get_current_user_required),
 ):
     svc = _link_service(request, db)
     link = svc.update(short_code, data, owner_id=current_user.id)
@@ -0,0 +1,31 @@
+import argparse
+import logging
+from typing import Optional
+
+from app.config import settings
+from app.core.database import init_db
+from app.jobs import run_cache_warmup
+
+
+def _parse_args(argv: Optional[list[str]] = None) -> argparse.Namespace:
+    parser = argparse.ArgumentParser(prog='python -m app.cli', description='Shortener maintenance commands.')
+    commands = parser.add_subparsers(dest='command', required=True)
+
+    warm = commands.add_parser('warm-cache', help='Preload the most clicked links into Redis')
+    warm.add_argument('--limit', type=int, default=settings.cache_warmup_limit, help='Links to load')
+    warm.add_argument('--batch-size', type=int, default=settings.cache_warmup_batch_size)
+    return parser.parse_args(argv)
+
+
+def main(argv: Optional[list[str]] = None) -> int:
+    args = _parse_args(argv)
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s %(levelname)s %(message)s')
+    init_db()
+    if args.command == 'warm-cache':
+        warmed = run_cache_warmup(args.limit, args.batch_size)
+        print(f'Warmed {warmed} links')
+    return 0
+
+
+if __name__ == '__main__':
+    raise SystemExit(main())
@@ -1,11 +1,22 @@
-from app.core.database import get_db, init_db
-from app.core.cache import cache
-from app.core.security import get_current_user_optional, get_current_user_required
+from app.core.database import get_db, get_async_db, init_db
+from app.core.cache import cache, async_cache
+from app.core.security import (
+    Principal,
+    get_current_user_optional,
+    get_current_user_required,
+    get_current_user_optional_async,
+    get_current_user_required_async,
+)
 
 __all__ = [
     'get_db',
+    'get_async_db',
     'init_db',
     'cache',
+    'async_cache',
+    'Principal',
     'get_current_user_optional',
     'get_current_user_required',
+    'get_current_user_optional_async',
+    'get_current_user_required_async',
 ]
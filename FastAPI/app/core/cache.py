@@ -1,38 +1,308 @@
+import asyncio
 import json
-from typing import Any, Optional
+import math
+import random
+import threading
+import time
+import uuid
+from collections import OrderedDict
+from typing import Any, Awaitable, Callable, Optional
 
 import redis
+import redis.asyncio as aioredis
 from app.config import settings
+from app.core.metrics import CACHE_ERRORS, CACHE_OP_DURATION, record_cache_lookups
+from app.core.serialization import serializer
+from app.core.single_flight import AsyncSingleFlight, SingleFlight
 
 _redis: Optional[redis.Redis] = None
+_async_redis: Optional[aioredis.Redis] = None
+
+NAMESPACE_VERSION_KEY = 'ns:{}:version'
+INVALIDATION_CHANNEL = 'cache:invalidate'
+LEASE_KEY = 'lease:{}:{}'
+# Stored in place of a value the loader could not find, so repeated lookups
+# of unknown keys are answered from the cache.
+_TOMBSTONE = {'__missing__': True}
+
+# Namespaced keys look like '<namespace>:v<version>:<key>'. Each script reads
+# the namespace version and touches the versioned keys in one round trip.
+_NS_GET_SCRIPT = """
+local prefix = ARGV[1] .. ':v' .. (redis.call('GET', KEYS[1]) or '0') .. ':'
+local values = {}
+for i = 2, #ARGV do
+    values[i - 1] = redis.call('GET', prefix .. ARGV[i])
+end
+return values
+"""
+_NS_SET_SCRIPT = """
+local prefix = ARGV[1] .. ':v' .. (redis.call('GET', KEYS[1]) or '0') .. ':'
+for i = 3, #ARGV, 2 do
+    redis.call('SETEX', prefix .. ARGV[i], ARGV[2], ARGV[i + 1])
+end
+return 1
+"""
+# Like set, but leaves existing keys (fresher values, tombstones) alone and
+# reports which keys it wrote.
+_NS_ADD_SCRIPT = """
+local prefix = ARGV[1] .. ':v' .. (redis.call('GET', KEYS[1]) or '0') .. ':'
+local added = {}
+for i = 3, #ARGV, 2 do
+    added[#added + 1] = redis.call('SET', prefix .. ARGV[i], ARGV[i + 1], 'EX', ARGV[2], 'NX') and 1 or 0
+end
+return added
+"""
+_NS_DELETE_SCRIPT = """
+local prefix = ARGV[1] .. ':v' .. (redis.call('GET', KEYS[1]) or '0') .. ':'
+for i = 2, #ARGV do
+    redis.call('DEL', prefix .. ARGV[i])
+end
+return 1
+"""
+_NS_GET_TTL_SCRIPT = """
+local name = ARGV[1] .. ':v' .. (redis.call('GET', KEYS[1]) or '0') .. ':' .. ARGV[2]
+return {redis.call('GET', name), redis.call('PTTL', name)}
+"""
+_SCRIPTS = {
+    'get': _NS_GET_SCRIPT,
+    'get_ttl': _NS_GET_TTL_SCRIPT,
+    'set': _NS_SET_SCRIPT,
+    'add': _NS_ADD_SCRIPT,
+    'delete': _NS_DELETE_SCRIPT,
+}
+
+# Only the holder of a lease or lock may release it; one that expired and
+# was since taken over by another worker is left alone.
+RELEASE_LOCK_SCRIPT = """
+if redis.call('GET', KEYS[1]) == ARGV[1] then
+    return redis.call('DEL', KEYS[1])
+end
+return 0
+"""
 
 
 def get_redis() -> redis.Redis:
     global _redis
     if _redis is None:
-        _redis = redis.from_url(settings.redis_url, decode_responses=True)
+        pool = redis.ConnectionPool.from_url(
+            settings.redis_url,
+            max_connections=settings.redis_max_connections,
+            socket_timeout=settings.redis_socket_timeout_seconds,
+            decode_responses=True,
+        )
+        _redis = redis.Redis(connection_pool=pool)
     return _redis
 
 
+def get_async_redis() -> aioredis.Redis:
+    global _async_redis
+    if _async_redis is None:
+        pool = aioredis.ConnectionPool.from_url(
+            settings.redis_url,
+            max_connections=settings.redis_max_connections,
+            socket_timeout=settings.redis_socket_timeout_seconds,
+            decode_responses=True,
+        )
+        _async_redis = aioredis.Redis(connection_pool=pool)
+    return _async_redis
+
+
+async def close_async_redis() -> None:
+    global _async_redis
+    if _async_redis is not None:
+        await _async_redis.aclose()
+        _async_redis = None
+
+
+def _loads(raw: Optional[str]) -> Optional[Any]:
+    if raw is None:
+        return None
+    try:
+        return serializer.loads(raw)
+    except json.JSONDecodeError:
+        return None
+
+
+def _dumps(value: Any) -> str:
+    return serializer.dumps(value)
+
+
+class LocalCache:
+    def __init__(self, max_entries: int, ttl: int):
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self.hits = 0
+        self.misses = 0
+        self._entries: OrderedDict[tuple[str, str], tuple[float, Any]] = OrderedDict()
+        self._epochs: dict[str, int] = {}
+        self._lock = threading.Lock()
+
+    def epoch(self, namespace: str) -> int:
+        return self._epochs.get(namespace, 0)
+
+    def get(self, namespace: str, key: str) -> Optional[Any]:
+        with self._lock:
+            entry = self._entries.get((namespace, key))
+            if entry is None or entry[0] < time.monotonic():
+                if entry is not None:
+                    del self._entries[(namespace, key)]
+                self.misses += 1
+                return None
+            self._entries.move_to_end((namespace, key))
+            self.hits += 1
+            return entry[1]
+
+    def set(self, namespace: str, key: str, value: Any, epoch: Optional[int] = None) -> None:
+        with self._lock:
+            if epoch is not None and epoch != self._epochs.get(namespace, 0):
+                return
+            self._entries[(namespace, key)] = (time.monotonic() + self.ttl, value)
+            self._entries.move_to_end((namespace, key))
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def evict(self, keys: dict[str, list[str]], namespaces: tuple[str, ...] = ()) -> None:
+        with self._lock:
+            for namespace, ns_keys in keys.items():
+                self._epochs[namespace] = self._epochs.get(namespace, 0) + 1
+                for key in ns_keys:
+                    self._entries.pop((namespace, key), None)
+            for namespace in namespaces:
+                self._epochs[namespace] = self._epochs.get(namespace, 0) + 1
+                for entry_key in [k for k in self._entries if k[0] == namespace]:
+                    del self._entries[entry_key]
+
+    def clear(self) -> None:
+        with self._lock:
+            for namespace in {k[0] for k in self._entries}:
+                self._epochs[namespace] = self._epochs.get(namespace, 0) + 1
+            self._entries.clear()
+
+    def stats(self) -> dict:
+        with self._lock:
+            total = self.hits + self.misses
+            return {
+                'entries': len(self._entries),
+                'hits': self.hits,
+                'misses': self.misses,
+                'hit_ratio': self.hits / total if total else 0.0,
+            }
+
+
+local_cache = LocalCache(settings.l1_cache_max_entries, settings.l1_cache_ttl_seconds)
+
+
+def _local_for(namespace: str) -> Optional[LocalCache]:
+    if settings.l1_cache_enabled and namespace in settings.l1_cache_namespaces:
+        return local_cache
+    return None
+
+
+def _invalidation_message(keys: dict[str, list[str]], bump: tuple[str, ...]) -> str:
+    return json.dumps({'keys': keys, 'bump': list(bump)})
+
+
+def _apply_invalidation(raw: str) -> None:
+    try:
+        message = json.loads(raw)
+    except json.JSONDecodeError:
+        return
+    local_cache.evict(message.get('keys', {}), tuple(message.get('bump', ())))
+
+
+async def listen_for_invalidations() -> None:
+    while True:
+        pubsub = None
+        try:
+            pubsub = get_async_redis().pubsub(ignore_subscribe_messages=True)
+            await pubsub.subscribe(INVALIDATION_CHANNEL)
+            while True:
+                message = await pubsub.get_message(ignore_subscribe_messages=True, timeout=1.0)
+                if message is not None:
+                    _apply_invalidation(message['data'])
+        except redis.RedisError:
+            local_cache.clear()
+            await asyncio.sleep(1)
+        finally:
+            if pubsub is not None:
+                try:
+                    await pubsub.aclose()
+                except redis.RedisError:
+                    pass
+
+
+class _LoadTimer:
+    # Exponentially weighted average of how long loaders take per namespace;
+    # it is the "delta" of probabilistic early expiration (XFetch).
+    def __init__(self, alpha: float = 0.2):
+        self.alpha = alpha
+        self._seconds: dict[str, float] = {}
+
+    def observe(self, namespace: str, seconds: float) -> None:
+        previous = self._seconds.get(namespace)
+        self._seconds[namespace] = seconds if previous is None else previous + self.alpha * (seconds - previous)
+
+    def should_refresh(self, namespace: str, ttl_ms: int) -> bool:
+        beta = settings.cache_early_refresh_beta
+        if beta <= 0 or ttl_ms < 0:
+            return False
+        delta = self._seconds.get(namespace, 0.0)
+        return delta * beta * -math.log(1.0 - random.random()) * 1000 >= ttl_ms
+
+
+def _record_remote_lookups(namespace: str, values: list[Optional[Any]]) -> None:
+    hits = negative = 0
+    for value in values:
+        if value == _TOMBSTONE:
+            negative += 1
+        elif value is not None:
+            hits += 1
+    record_cache_lookups(namespace, 'hit', hits)
+    record_cache_lookups(namespace, 'negative', negative)
+    record_cache_lookups(namespace, 'miss', len(values) - hits - negative)
+
+
+def _unpack_with_ttl(result: list) -> tuple[Optional[Any], int]:
+    raw, ttl_ms = result
+    return _loads(raw or None), int(ttl_ms)
+
+
 class Cache:
     def __init__(self, default_ttl: int = 0):
         self.default_ttl = default_ttl or settings.cache_ttl_seconds
+        self._scripts: dict = {}
+        self._flight = SingleFlight()
+        self._timer = _LoadTimer()
+
+    def _script(self, name: str, r: redis.Redis):
+        if name not in self._scripts:
+            self._scripts[name] = r.register_script(_SCRIPTS[name])
+        return self._scripts[name]
+
+    def _run_script(self, name: str, namespace: str, args: list) -> Any:
+        r = get_redis()
+        started = time.perf_counter()
+        try:
+            return self._script(name, r)(
+                keys=[NAMESPACE_VERSION_KEY.format(namespace)],
+                args=[namespace, *args],
+                client=r,
+            )
+        except redis.RedisError:
+            CACHE_ERRORS.labels(name).inc()
+            raise
+        finally:
+            CACHE_OP_DURATION.labels(name).observe(time.perf_counter() - started)
 
     def get(self, key: str) -> Optional[Any]:
         try:
-            r = get_redis()
-            raw = r.get(key)
-            if raw is None:
-                return None
-            return json.loads(raw)
-        except (redis.RedisError, json.JSONDecodeError):
+            return _loads(get_redis().get(key))
+        except redis.RedisError:
             return None
 
     def set(self, key: str, value: Any, ttl: Optional[int] = None) -> None:
         try:
-            r = get_redis()
-            ttl = ttl or self.default_ttl
-            r.setex(key, ttl, json.dumps(value, default=str))
+            get_redis().setex(key, ttl or self.default_ttl, _dumps(value))
         except (redis.RedisError, TypeError):
             pass
 
@@ -42,13 +312,408 @@ class Cache:
         except redis.RedisError:
             pass
 
-    def delete_pattern(self, pattern: str) -> None:
+    def ns_get(self, namespace: str, key: str) -> Optional[Any]:
+        local = _local_for(namespace)
+        value = local.get(namespace, key) if local is not None else None
+        if value is not None:
+            record_cache_lookups(namespace, 'l1_hit')
+        else:
+            epoch = local.epoch(namespace) if local is not None else None
+            value = self._ns_get_remote(namespace, key)
+            _record_remote_lookups(namespace, [value])
+            if local is not None and value is not None:
+                local.set(namespace, key, value, epoch)
+        return None if value == _TOMBSTONE else value
+
+    # Raw accessors store and return the string as is, bypassing the
+    # serializer and the L1 cache: used for response bodies served verbatim.
+    def ns_get_raw(self, namespace: str, key: str) -> Optional[str]:
+        try:
+            raw = self._run_script('get', namespace, [key])[0]
+        except redis.RedisError:
+            raw = None
+        record_cache_lookups(namespace, 'hit' if raw else 'miss')
+        return raw or None
+
+    def ns_set_raw(self, namespace: str, key: str, raw: str, ttl: Optional[int] = None) -> None:
+        try:
+            self._run_script('set', namespace, [ttl or self.default_ttl, key, raw])
+        except redis.RedisError:
+            pass
+
+    def _ns_get_remote(self, namespace: str, key: str) -> Optional[Any]:
+        try:
+            return _loads(self._run_script('get', namespace, [key])[0])
+        except redis.RedisError:
+            return None
+
+    def ns_get_or_load(
+        self,
+        namespace: str,
+        key: str,
+        loader: Callable[[], Optional[Any]],
+        ttl: Optional[int] = None,
+        negative_ttl: Optional[int] = None,
+    ) -> Optional[Any]:
+        local = _local_for(namespace)
+        value = local.get(namespace, key) if local is not None else None
+        if value is not None:
+            record_cache_lookups(namespace, 'l1_hit')
+        else:
+            value = self._flight.do(
+                f'{namespace}:{key}',
+                lambda: self._get_or_load_remote(namespace, key, loader, ttl, negative_ttl),
+            )
+        return None if value == _TOMBSTONE else value
+
+    def _get_or_load_remote(
+        self,
+        namespace: str,
+        key: str,
+        loader: Callable[[], Optional[Any]],
+        ttl: Optional[int],
+        negative_ttl: Optional[int],
+    ) -> Optional[Any]:
+        local = _local_for(namespace)
+        epoch = local.epoch(namespace) if local is not None else None
+        try:
+            value, ttl_ms = _unpack_with_ttl(self._run_script('get_ttl', namespace, [key]))
+        except redis.RedisError:
+            record_cache_lookups(namespace, 'miss')
+            return self._load(namespace, key, loader, ttl, negative_ttl)
+        _record_remote_lookups(namespace, [value])
+        if value is not None and not self._timer.should_refresh(namespace, ttl_ms):
+            if local is not None:
+                local.set(namespace, key, value, epoch)
+            return value
+        token = self._acquire_lease(namespace, key)
+        if token is None:
+            # Another worker holds the lease and is refilling this key: serve
+            # the current value if there is one, otherwise wait briefly for it.
+            if value is None:
+                value = self._wait_for_fill(namespace, key)
+            if value is not None:
+                return value
+        try:
+            return self._load(namespace, key, loader, ttl, negative_ttl)
+        finally:
+            if token:
+                self._release_lease(namespace, key, token)
+
+    def _load(
+        self,
+        namespace: str,
+        key: str,
+        loader: Callable[[], Optional[Any]],
+        ttl: Optional[int],
+        negative_ttl: Optional[int],
+    ) -> Optional[Any]:
+        started = time.monotonic()
+        value = loader()
+        self._timer.observe(namespace, time.monotonic() - started)
+        if value is not None:
+            self.ns_set(namespace, key, value, ttl)
+        elif negative_ttl:
+            self.ns_set(namespace, key, _TOMBSTONE, negative_ttl)
+        return value
+
+    def _acquire_lease(self, namespace: str, key: str) -> Optional[str]:
+        token = uuid.uuid4().hex
+        try:
+            acquired = get_redis().set(
+                LEASE_KEY.format(namespace, key), token, nx=True, px=settings.cache_lease_ms
+            )
+        except redis.RedisError:
+            CACHE_ERRORS.labels('lease').inc()
+            return ''
+        return token if acquired else None
+
+    def _release_lease(self, namespace: str, key: str, token: str) -> None:
+        try:
+            get_redis().eval(RELEASE_LOCK_SCRIPT, 1, LEASE_KEY.format(namespace, key), token)
+        except redis.RedisError:
+            pass
+
+    def _wait_for_fill(self, namespace: str, key: str) -> Optional[Any]:
+        deadline = time.monotonic() + settings.cache_lease_wait_ms / 1000
+        while time.monotonic() < deadline:
+            time.sleep(settings.cache_lease_poll_ms / 1000)
+            value = self._ns_get_remote(namespace, key)
+            if value is not None:
+                return value
+        return None
+
+    def ns_set(self, namespace: str, key: str, value: Any, ttl: Optional[int] = None) -> None:
+        # The L1 copy is skipped if the namespace was invalidated meanwhile.
+        local = _local_for(namespace)
+        epoch = local.epoch(namespace) if local is not None else None
+        try:
+            self._run_script('set', namespace, [ttl or self.default_ttl, key, _dumps(value)])
+        except (redis.RedisError, TypeError):
+            return
+        if local is not None:
+            local.set(namespace, key, value, epoch)
+
+    def ns_set_missing(self, namespace: str, key: str, ttl: int) -> None:
+        # Stores a tombstone ahead of any lookup, e.g. right after a delete.
+        self.ns_set(namespace, key, _TOMBSTONE, ttl)
+
+    def ns_add_many(self, namespace: str, values: dict[str, Any], ttl: Optional[int] = None) -> int:
+        if not values:
+            return 0
+        local = _local_for(namespace)
+        epoch = local.epoch(namespace) if local is not None else None
+        try:
+            args = [ttl or self.default_ttl]
+            for key, value in values.items():
+                args.extend((key, _dumps(value)))
+            added = self._run_script('add', namespace, args)
+        except (redis.RedisError, TypeError):
+            return 0
+        if local is not None:
+            for (key, value), flag in zip(values.items(), added):
+                if flag:
+                    local.set(namespace, key, value, epoch)
+        return sum(added)
+
+    def ns_delete(self, namespace: str, *keys: str) -> None:
+        self.invalidate({namespace: list(keys)})
+
+    def bump(self, *namespaces: str) -> None:
+        self.invalidate({}, bump=namespaces)
+
+    def invalidate(self, keys: dict[str, list[str]], bump: tuple[str, ...] = ()) -> None:
+        local_cache.evict(keys, bump)
         try:
             r = get_redis()
-            for key in r.scan_iter(match=pattern):
-                r.delete(key)
+            pipe = r.pipeline(transaction=False)
+            for namespace, ns_keys in keys.items():
+                if ns_keys:
+                    self._script('delete', r)(
+                        keys=[NAMESPACE_VERSION_KEY.format(namespace)],
+                        args=[namespace, *ns_keys],
+                        client=pipe,
+                    )
+            for namespace in bump:
+                pipe.incr(NAMESPACE_VERSION_KEY.format(namespace))
+            if settings.l1_cache_enabled:
+                pipe.publish(INVALIDATION_CHANNEL, _invalidation_message(keys, bump))
+            pipe.execute()
+        except redis.RedisError:
+            CACHE_ERRORS.labels('invalidate').inc()
+
+
+class AsyncCache:
+    def __init__(self, default_ttl: int = 0):
+        self.default_ttl = default_ttl or settings.cache_ttl_seconds
+        self._scripts: dict = {}
+        self._flight = AsyncSingleFlight()
+        self._timer = _LoadTimer()
+
+    def _script(self, name: str, r: aioredis.Redis):
+        if name not in self._scripts:
+            self._scripts[name] = r.register_script(_SCRIPTS[name])
+        return self._scripts[name]
+
+    async def _run_script(self, name: str, namespace: str, args: list) -> Any:
+        r = get_async_redis()
+        started = time.perf_counter()
+        try:
+            return await self._script(name, r)(
+                keys=[NAMESPACE_VERSION_KEY.format(namespace)],
+                args=[namespace, *args],
+                client=r,
+            )
+        except redis.RedisError:
+            CACHE_ERRORS.labels(name).inc()
+            raise
+        finally:
+            CACHE_OP_DURATION.labels(name).observe(time.perf_counter() - started)
+
+    async def get(self, key: str) -> Optional[Any]:
+        try:
+            return _loads(await get_async_redis().get(key))
+        except redis.RedisError:
+            return None
+
+    async def set(self, key: str, value: Any, ttl: Optional[int] = None) -> None:
+        try:
+            await get_async_redis().setex(key, ttl or self.default_ttl, _dumps(value))
+        except (redis.RedisError, TypeError):
+            pass
+
+    async def delete(self, key: str) -> None:
+        try:
+            await get_async_redis().delete(key)
+        except redis.RedisError:
+            pass
+
+    async def ns_get(self, namespace: str, key: str) -> Optional[Any]:
+        local = _local_for(namespace)
+        value = local.get(namespace, key) if local is not None else None
+        if value is not None:
+            record_cache_lookups(namespace, 'l1_hit')
+        else:
+            epoch = local.epoch(namespace) if local is not None else None
+            value = await self._ns_get_remote(namespace, key)
+            _record_remote_lookups(namespace, [value])
+            if local is not None and value is not None:
+                local.set(namespace, key, value, epoch)
+        return None if value == _TOMBSTONE else value
+
+    async def ns_get_raw(self, namespace: str, key: str) -> Optional[str]:
+        try:
+            raw = (await self._run_script('get', namespace, [key]))[0]
+        except redis.RedisError:
+            raw = None
+        record_cache_lookups(namespace, 'hit' if raw else 'miss')
+        return raw or None
+
+    async def ns_set_raw(self, namespace: str, key: str, raw: str, ttl: Optional[int] = None) -> None:
+        try:
+            await self._run_script('set', namespace, [ttl or self.default_ttl, key, raw])
+        except redis.RedisError:
+            pass
+
+    async def _ns_get_remote(self, namespace: str, key: str) -> Optional[Any]:
+        try:
+            return _loads((await self._run_script('get', namespace, [key]))[0])
+        except redis.RedisError:
+            return None
+
+    async def ns_get_or_load(
+        self,
+        namespace: str,
+        key: str,
+        loader: Callable[[], Awaitable[Optional[Any]]],
+        ttl: Optional[int] = None,
+        negative_ttl: Optional[int] = None,
+    ) -> Optional[Any]:
+        local = _local_for(namespace)
+        value = local.get(namespace, key) if local is not None else None
+        if value is not None:
+            record_cache_lookups(namespace, 'l1_hit')
+        else:
+            value = await self._flight.do(
+                f'{namespace}:{key}',
+                lambda: self._get_or_load_remote(namespace, key, loader, ttl, negative_ttl),
+            )
+        return None if value == _TOMBSTONE else value
+
+    async def _get_or_load_remote(
+        self,
+        namespace: str,
+        key: str,
+        loader: Callable[[], Awaitable[Optional[Any]]],
+        ttl: Optional[int],
+        negative_ttl: Optional[int],
+    ) -> Optional[Any]:
+        local = _local_for(namespace)
+        epoch = local.epoch(namespace) if local is not None else None
+        try:
+            value, ttl_ms = _unpack_with_ttl(await self._run_script('get_ttl', namespace, [key]))
+        except redis.RedisError:
+            record_cache_lookups(namespace, 'miss')
+            return await self._load(namespace, key, loader, ttl, negative_ttl)
+        _record_remote_lookups(namespace, [value])
+        if value is not None and not self._timer.should_refresh(namespace, ttl_ms):
+            if local is not None:
+                local.set(namespace, key, value, epoch)
+            return value
+        token = await self._acquire_lease(namespace, key)
+        if token is None:
+            if value is None:
+                value = await self._wait_for_fill(namespace, key)
+            if value is not None:
+                return value
+        try:
+            return await self._load(namespace, key, loader, ttl, negative_ttl)
+        finally:
+            if token:
+                await self._release_lease(namespace, key, token)
+
+    async def _load(
+        self,
+        namespace: str,
+        key: str,
+        loader: Callable[[], Awaitable[Optional[Any]]],
+        ttl: Optional[int],
+        negative_ttl: Optional[int],
+    ) -> Optional[Any]:
+        started = time.monotonic()
+        value = await loader()
+        self._timer.observe(namespace, time.monotonic() - started)
+        if value is not None:
+            await self.ns_set(namespace, key, value, ttl)
+        elif negative_ttl:
+            await self.ns_set(namespace, key, _TOMBSTONE, negative_ttl)
+        return value
+
+    async def _acquire_lease(self, namespace: str, key: str) -> Optional[str]:
+        token = uuid.uuid4().hex
+        try:
+            acquired = await get_async_redis().set(
+                LEASE_KEY.format(namespace, key), token, nx=True, px=settings.cache_lease_ms
+            )
+        except redis.RedisError:
+            CACHE_ERRORS.labels('lease').inc()
+            return ''
+        return token if acquired else None
+
+    async def _release_lease(self, namespace: str, key: str, token: str) -> None:
+        try:
+            await get_async_redis().eval(RELEASE_LOCK_SCRIPT, 1, LEASE_KEY.format(namespace, key), token)
         except redis.RedisError:
             pass
 
+    async def _wait_for_fill(self, namespace: str, key: str) -> Optional[Any]:
+        deadline = time.monotonic() + settings.cache_lease_wait_ms / 1000
+        while time.monotonic() < deadline:
+            await asyncio.sleep(settings.cache_lease_poll_ms / 1000)
+            value = await self._ns_get_remote(namespace, key)
+            if value is not None:
+                return value
+        return None
+
+    async def ns_set(self, namespace: str, key: str, value: Any, ttl: Optional[int] = None) -> None:
+        local = _local_for(namespace)
+        epoch = local.epoch(namespace) if local is not None else None
+        try:
+            await self._run_script('set', namespace, [ttl or self.default_ttl, key, _dumps(value)])
+        except (redis.RedisError, TypeError):
+            return
+        if local is not None:
+            local.set(namespace, key, value, epoch)
+
+    async def ns_set_missing(self, namespace: str, key: str, ttl: int) -> None:
+        await self.ns_set(namespace, key, _TOMBSTONE, ttl)
+
+    async def ns_delete(self, namespace: str, *keys: str) -> None:
+        await self.invalidate({namespace: list(keys)})
+
+    async def bump(self, *namespaces: str) -> None:
+        await self.invalidate({}, bump=namespaces)
+
+    async def invalidate(self, keys: dict[str, list[str]], bump: tuple[str, ...] = ()) -> None:
+        local_cache.evict(keys, bump)
+        try:
+            r = get_async_redis()
+            async with r.pipeline(transaction=False) as pipe:
+                for namespace, ns_keys in keys.items():
+                    if ns_keys:
+                        await self._script('delete', r)(
+                            keys=[NAMESPACE_VERSION_KEY.format(namespace)],
+                            args=[namespace, *ns_keys],
+                            client=pipe,
+                        )
+                for namespace in bump:
+                    pipe.incr(NAMESPACE_VERSION_KEY.format(namespace))
+                if settings.l1_cache_enabled:
+                    pipe.publish(INVALIDATION_CHANNEL, _invalidation_message(keys, bump))
+                await pipe.execute()
+        except redis.RedisError:
+            CACHE_ERRORS.labels('invalidate').inc()
+
 
 cache = Cache()
+async_cache = AsyncCache()
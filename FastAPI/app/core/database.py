@@ -1,21 +1,84 @@
+from typing import Optional
+
 from sqlalchemy import create_engine
+from sqlalchemy.engine import Engine
+from sqlalchemy.ext.asyncio import AsyncEngine, AsyncSession, async_sessionmaker, create_async_engine
 from sqlalchemy.orm import sessionmaker, declarative_base
 
 from app.config import settings
+from app.core.metrics import instrument_engine
 
 Base = declarative_base()
-engine = create_engine(
-    settings.database_url,
-    pool_pre_ping=True,
-    echo=settings.debug,
-)
-SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
+
+
+def _async_database_url(url: str) -> str:
+    for prefix, driver in (
+        ('postgresql://', 'postgresql+asyncpg://'),
+        ('postgres://', 'postgresql+asyncpg://'),
+        ('sqlite://', 'sqlite+aiosqlite://'),
+    ):
+        if url.startswith(prefix):
+            return driver + url[len(prefix):]
+    return url
+
+
+def _engine_options(url: str) -> dict:
+    options = {'pool_pre_ping': settings.db_pool_pre_ping, 'echo': settings.debug}
+    # SQLite picks its own pool class; sizing arguments only apply to server databases.
+    if not url.startswith('sqlite'):
+        options.update(
+            pool_size=settings.db_pool_size,
+            max_overflow=settings.db_max_overflow,
+            pool_timeout=settings.db_pool_timeout_seconds,
+            pool_recycle=settings.db_pool_recycle_seconds,
+        )
+    return options
+
+
+def _make_engine(url: str) -> Engine:
+    engine = create_engine(url, **_engine_options(url))
+    if settings.metrics_enabled:
+        instrument_engine(engine)
+    return engine
+
+
+def _make_async_engine(url: str) -> AsyncEngine:
+    engine = create_async_engine(_async_database_url(url), **_engine_options(url))
+    if settings.metrics_enabled:
+        instrument_engine(engine.sync_engine)
+    return engine
+
+
+def _async_sessionmaker(engine: AsyncEngine) -> async_sessionmaker:
+    return async_sessionmaker(engine, class_=AsyncSession, autoflush=False, expire_on_commit=False)
+
+
+engine = _make_engine(settings.database_url)
+SessionLocal = sessionmaker(autocommit=False, autoflush=False, expire_on_commit=False, bind=engine)
+
+async_engine = _make_async_engine(settings.database_url)
+AsyncSessionLocal = _async_sessionmaker(async_engine)
+
+# Optional read replica for read-only paths (stats, search, cache-miss
+# redirects). Without DATABASE_REPLICA_URL those paths use the primary session.
+read_engine: Optional[Engine] = None
+ReadSessionLocal: Optional[sessionmaker] = None
+async_read_engine: Optional[AsyncEngine] = None
+AsyncReadSessionLocal: Optional[async_sessionmaker] = None
+
+if settings.database_replica_url:
+    read_engine = _make_engine(settings.database_replica_url)
+    ReadSessionLocal = sessionmaker(autocommit=False, autoflush=False, expire_on_commit=False, bind=read_engine)
+    async_read_engine = _make_async_engine(settings.database_replica_url)
+    AsyncReadSessionLocal = _async_sessionmaker(async_read_engine)
 
 
 def init_db() -> None:
-    from app.models import link, user
+    from app.core.migrations import migrate
+    from app.models import click_flush, click_rollup, link, link_archive, user
 
     Base.metadata.create_all(bind=engine)
+    migrate(engine)
 
 
 def get_db():
@@ -24,3 +87,27 @@ def get_db():
         yield db
     finally:
         db.close()
+
+
+async def get_async_db():
+    async with AsyncSessionLocal() as db:
+        yield db
+
+
+def get_read_db():
+    if ReadSessionLocal is None:
+        yield None
+        return
+    db = ReadSessionLocal()
+    try:
+        yield db
+    finally:
+        db.close()
+
+
+async def get_async_read_db():
+    if AsyncReadSessionLocal is None:
+        yield None
+        return
+    async with AsyncReadSessionLocal() as db:
+        yield db
@@ -0,0 +1,157 @@
+import asyncio
+import logging
+import time
+from datetime import datetime
+from typing import Any, Awaitable, Callable, Optional
+
+from sqlalchemy import text
+from sqlalchemy.engine import Engine
+from sqlalchemy.pool import QueuePool
+
+from app.config import settings
+from app.core import database
+from app.core.cache import get_async_redis, local_cache
+from app.core.metrics import cache_lookup_totals
+
+logger = logging.getLogger(__name__)
+
+_CACHE_HIT_RESULTS = ('l1_hit', 'hit', 'negative')
+
+
+def _ping_engine(engine: Engine) -> None:
+    with engine.connect() as conn:
+        conn.execute(text('SELECT 1'))
+
+
+def _pool_usage(engine: Engine) -> Optional[dict]:
+    pool = engine.pool
+    if not isinstance(pool, QueuePool):
+        return None
+    checked_out = pool.checkedout()
+    capacity = settings.db_pool_size + max(settings.db_max_overflow, 0)
+    return {
+        'checked_out': checked_out,
+        'capacity': capacity,
+        'saturation': round(checked_out / capacity, 3) if capacity else 0.0,
+    }
+
+
+class HealthSampler:
+    # Probes run on a timer in the background; health endpoints only read
+    # the last snapshot, so load balancer checks never touch Postgres or Redis.
+    def __init__(self):
+        self._snapshot: Optional[dict] = None
+        self._sampled_at: Optional[float] = None
+        self._lookups: dict[str, float] = {}
+        self._reporters: dict[str, Callable[[], Any]] = {}
+
+    def add_reporter(self, name: str, func: Callable[[], Any]) -> None:
+        # Blocking status callables (e.g. progress kept in Redis) refreshed
+        # together with the probes.
+        self._reporters[name] = func
+
+    async def _timed(self, probe: Callable[[], Awaitable[Any]]) -> dict:
+        started = time.perf_counter()
+        try:
+            await asyncio.wait_for(probe(), settings.health_probe_timeout_seconds)
+        except Exception as e:
+            return {'ok': False, 'error': str(e) or type(e).__name__}
+        return {'ok': True, 'latency_ms': round((time.perf_counter() - started) * 1000, 2)}
+
+    async def _probe_database(self, serving: Engine, async_engine) -> dict:
+        if settings.async_endpoints:
+            async def probe():
+                async with async_engine.connect() as conn:
+                    await conn.execute(text('SELECT 1'))
+        else:
+            async def probe():
+                await asyncio.get_running_loop().run_in_executor(None, _ping_engine, serving)
+        result = await self._timed(probe)
+        result['pool'] = _pool_usage(async_engine.sync_engine if settings.async_endpoints else serving)
+        return result
+
+    def _cache_hit_ratio(self) -> Optional[float]:
+        # Over the last sampling window rather than since startup, so a
+        # cold or degraded cache shows up quickly.
+        totals = cache_lookup_totals()
+        delta = {result: count - self._lookups.get(result, 0) for result, count in totals.items()}
+        self._lookups = totals
+        lookups = sum(delta.values())
+        if not lookups:
+            return None
+        return round(sum(delta.get(result, 0) for result in _CACHE_HIT_RESULTS) / lookups, 4)
+
+    async def sample(self, loop_lag: float = 0.0) -> dict:
+        probes = {
+            'database': await self._probe_database(database.engine, database.async_engine),
+            'redis': await self._timed(lambda: get_async_redis().ping()),
+        }
+        if database.read_engine is not None:
+            probes['replica'] = await self._probe_database(database.read_engine, database.async_read_engine)
+        snapshot = {
+            'sampled_at': datetime.utcnow().isoformat(),
+            'loop_lag_ms': round(loop_lag * 1000, 2),
+            'probes': probes,
+            'cache': {'hit_ratio': self._cache_hit_ratio(), 'l1': local_cache.stats()},
+        }
+        loop = asyncio.get_running_loop()
+        for name, func in self._reporters.items():
+            try:
+                snapshot[name] = await loop.run_in_executor(None, func)
+            except Exception as e:
+                snapshot[name] = {'error': str(e)}
+        self._snapshot = snapshot
+        self._sampled_at = time.monotonic()
+        return snapshot
+
+    async def run(self) -> None:
+        loop = asyncio.get_running_loop()
+        lag = 0.0
+        while True:
+            try:
+                await self.sample(lag)
+            except Exception:
+                logger.exception('Health sampling failed')
+            started = loop.time()
+            await asyncio.sleep(settings.health_sample_interval_seconds)
+            # Oversleeping means the event loop is blocked or overloaded.
+            lag = max(0.0, loop.time() - started - settings.health_sample_interval_seconds)
+
+    def snapshot(self) -> Optional[dict]:
+        return self._snapshot
+
+    def readiness(self) -> tuple[bool, dict]:
+        snapshot = self._snapshot
+        if snapshot is None:
+            return False, {'status': 'starting'}
+        age = time.monotonic() - self._sampled_at
+        reasons, degraded = [], []
+        if age > settings.health_sample_interval_seconds * 3:
+            reasons.append('stale_sample')
+        for name in ('database', 'replica'):
+            probe = snapshot['probes'].get(name)
+            if probe is None:
+                continue
+            if not probe['ok']:
+                reasons.append(f'{name}_unavailable')
+            elif probe['latency_ms'] > settings.health_max_db_latency_ms:
+                reasons.append(f'{name}_slow')
+            if probe['pool'] and probe['pool']['saturation'] >= settings.health_max_pool_saturation:
+                reasons.append(f'{name}_pool_saturated')
+        if snapshot['loop_lag_ms'] > settings.health_max_loop_lag_ms:
+            reasons.append('event_loop_lag')
+        # Redis is shared by every worker and each path has a fallback, so
+        # losing it degrades the service but is no reason to pull a worker.
+        if not snapshot['probes']['redis']['ok']:
+            degraded.append('redis_unavailable')
+        status = 'not_ready' if reasons else 'degraded' if degraded else 'ready'
+        body = {
+            'status': status,
+            'reasons': reasons + degraded,
+            'age_seconds': round(age, 2),
+            **snapshot,
+        }
+        return not reasons, body
+
+
+health_sampler = HealthSampler()
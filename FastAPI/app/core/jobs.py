@@ -0,0 +1,281 @@
+import asyncio
+import json
+import logging
+import time
+import uuid
+from concurrent.futures import Executor
+from dataclasses import dataclass
+from typing import Callable, Optional
+
+import redis
+
+from app.config import settings
+from app.core.cache import get_async_redis
+from app.core.metrics import JOB_DURATION, JOB_LEADER, JOB_QUEUE_DEPTH, JOB_RUNS
+
+logger = logging.getLogger(__name__)
+
+JOB_QUEUE_KEY = 'jobs:queue'
+JOB_DELAYED_KEY = 'jobs:delayed'
+JOB_PROCESSING_KEY = 'jobs:processing'
+JOB_UNIQUE_KEY = 'jobs:unique:{}'
+JOB_SCHEDULE_KEY = 'jobs:scheduled:{}'
+JOB_LEADER_KEY = 'jobs:leader'
+
+# Queued jobs live in a list; delayed retries and claimed jobs live in sorted
+# sets scored by the time they become due. A claimed job whose lease ran out
+# (the worker died or stopped renewing) is due again, so every claim first
+# moves due entries of both sets back onto the queue.
+_CLAIM_SCRIPT = """
+for _, name in ipairs({KEYS[2], KEYS[3]}) do
+    local due = redis.call('ZRANGEBYSCORE', name, '-inf', ARGV[1], 'LIMIT', 0, 100)
+    for _, job in ipairs(due) do
+        redis.call('ZREM', name, job)
+        redis.call('LPUSH', KEYS[1], job)
+    end
+end
+local job = redis.call('RPOP', KEYS[1])
+if job then
+    redis.call('ZADD', KEYS[3], ARGV[2], job)
+end
+return job
+"""
+
+# Takes the leader lock or extends it if this instance already holds it.
+_ACQUIRE_LEADER_SCRIPT = """
+if redis.call('SET', KEYS[1], ARGV[1], 'NX', 'PX', ARGV[2]) then
+    return 1
+end
+if redis.call('GET', KEYS[1]) == ARGV[1] then
+    redis.call('PEXPIRE', KEYS[1], ARGV[2])
+    return 1
+end
+return 0
+"""
+
+_RELEASE_LEADER_SCRIPT = """
+if redis.call('GET', KEYS[1]) == ARGV[1] then
+    return redis.call('DEL', KEYS[1])
+end
+return 0
+"""
+
+
+@dataclass(frozen=True)
+class JobSpec:
+    name: str
+    func: Callable[[], object]
+    interval_seconds: Optional[float] = None
+    timeout_seconds: Optional[float] = None
+    max_attempts: int = settings.job_max_attempts
+    executor: Optional[Executor] = None
+    # Run right away in the enqueuing process when Redis is unreachable,
+    # instead of failing the enqueue.
+    local_fallback: bool = False
+
+    def unique_ttl_ms(self) -> int:
+        # Upper bound on how long one enqueue can stay in flight, so a
+        # uniqueness key left behind by a dead worker eventually clears.
+        run = self.timeout_seconds or settings.job_lease_seconds
+        backoff = settings.job_retry_backoff_seconds * (2 ** self.max_attempts - 1)
+        return int((run * self.max_attempts + backoff + settings.job_lease_seconds) * 1000)
+
+
+def _now_ms() -> int:
+    return int(time.time() * 1000)
+
+
+class JobQueue:
+    def __init__(self):
+        self.instance_id = uuid.uuid4().hex
+        self.is_leader = False
+        self._specs: dict[str, JobSpec] = {}
+        self._claim = None
+        self._acquire_leader = None
+        self._release_leader = None
+
+    def register(self, spec: JobSpec) -> JobSpec:
+        self._specs[spec.name] = spec
+        return spec
+
+    def _scripts(self, r) -> None:
+        if self._claim is None:
+            self._claim = r.register_script(_CLAIM_SCRIPT)
+            self._acquire_leader = r.register_script(_ACQUIRE_LEADER_SCRIPT)
+            self._release_leader = r.register_script(_RELEASE_LEADER_SCRIPT)
+
+    async def enqueue(self, name: str, unique: bool = True) -> bool:
+        spec = self._specs[name]
+        payload = json.dumps({'id': uuid.uuid4().hex, 'name': name, 'attempt': 1})
+        try:
+            r = get_async_redis()
+            unique_key = JOB_UNIQUE_KEY.format(name)
+            if unique and not await r.set(unique_key, payload, nx=True, px=spec.unique_ttl_ms()):
+                return False
+            await r.lpush(JOB_QUEUE_KEY, payload)
+            return True
+        except redis.RedisError:
+            if not spec.local_fallback:
+                raise
+            logger.warning('Redis unavailable, running job %s in this process', name)
+            await self._run_local(spec)
+            return True
+
+    async def _execute(self, spec: JobSpec) -> None:
+        future = asyncio.get_running_loop().run_in_executor(spec.executor, spec.func)
+        # On timeout the thread keeps running; the attempt is still counted
+        # as failed so a retry is scheduled.
+        await asyncio.wait_for(future, spec.timeout_seconds)
+
+    async def _run_local(self, spec: JobSpec) -> None:
+        started = time.perf_counter()
+        try:
+            await self._execute(spec)
+        except Exception:
+            JOB_RUNS.labels(spec.name, 'failed').inc()
+            logger.exception('Job %s failed', spec.name)
+        else:
+            JOB_RUNS.labels(spec.name, 'success').inc()
+        finally:
+            JOB_DURATION.labels(spec.name).observe(time.perf_counter() - started)
+
+    async def _renew_lease(self, r, payload: str) -> None:
+        interval = settings.job_lease_seconds / 3
+        while True:
+            await asyncio.sleep(interval)
+            try:
+                deadline = _now_ms() + settings.job_lease_seconds * 1000
+                await r.zadd(JOB_PROCESSING_KEY, {payload: deadline}, xx=True)
+            except redis.RedisError:
+                logger.warning('Could not renew the lease of a running job')
+
+    async def _finish(self, r, payload: str, job: dict, spec: Optional[JobSpec], error: bool) -> None:
+        retry = error and spec is not None and job['attempt'] < spec.max_attempts
+        async with r.pipeline(transaction=True) as pipe:
+            pipe.zrem(JOB_PROCESSING_KEY, payload)
+            if retry:
+                backoff = settings.job_retry_backoff_seconds * 2 ** (job['attempt'] - 1)
+                retried = json.dumps({**job, 'attempt': job['attempt'] + 1})
+                pipe.zadd(JOB_DELAYED_KEY, {retried: _now_ms() + int(backoff * 1000)})
+                # Keep the uniqueness key pointing at the copy still in flight.
+                pipe.set(JOB_UNIQUE_KEY.format(job['name']), retried, xx=True, keepttl=True)
+            else:
+                pipe.delete(JOB_UNIQUE_KEY.format(job['name']))
+            await pipe.execute()
+        if error:
+            JOB_RUNS.labels(job['name'], 'retry' if retry else 'failed').inc()
+        else:
+            JOB_RUNS.labels(job['name'], 'success').inc()
+
+    async def _process(self, r, payload: str) -> None:
+        try:
+            job = json.loads(payload)
+            name, attempt = job['name'], int(job['attempt'])
+        except (ValueError, KeyError, TypeError):
+            logger.error('Dropping malformed job payload %r', payload)
+            await r.zrem(JOB_PROCESSING_KEY, payload)
+            return
+        spec = self._specs.get(name)
+        if spec is None:
+            logger.error('Dropping unknown job %s', name)
+            await self._finish(r, payload, job, None, error=True)
+            return
+        renew = asyncio.create_task(self._renew_lease(r, payload))
+        started = time.perf_counter()
+        error = False
+        try:
+            await self._execute(spec)
+        except asyncio.CancelledError:
+            # Shutdown: leave the job claimed, it is picked up again once
+            # its lease expires.
+            raise
+        except Exception:
+            error = True
+            logger.exception('Job %s failed (attempt %d of %d)', spec.name, attempt, spec.max_attempts)
+        finally:
+            renew.cancel()
+            JOB_DURATION.labels(spec.name).observe(time.perf_counter() - started)
+        await self._finish(r, payload, job, spec, error)
+
+    async def worker(self) -> None:
+        reachable = True
+        while True:
+            try:
+                r = get_async_redis()
+                self._scripts(r)
+                now = _now_ms()
+                payload = await self._claim(
+                    keys=[JOB_QUEUE_KEY, JOB_DELAYED_KEY, JOB_PROCESSING_KEY],
+                    args=[now, now + settings.job_lease_seconds * 1000],
+                    client=r,
+                )
+                reachable = True
+                if payload is None:
+                    await asyncio.sleep(settings.job_poll_interval_seconds)
+                    continue
+                await self._process(r, payload)
+            except redis.RedisError:
+                if reachable:
+                    logger.warning('Job worker cannot reach Redis, retrying')
+                reachable = False
+                await asyncio.sleep(settings.job_poll_interval_seconds)
+            except Exception:
+                # Job failures are handled in _process; anything else must
+                # not end this worker for the rest of the process's life. A
+                # job left claimed is picked up again when its lease expires.
+                logger.exception('Job worker error, continuing')
+                await asyncio.sleep(settings.job_poll_interval_seconds)
+
+    async def _schedule(self, r) -> None:
+        for spec in self._specs.values():
+            if spec.interval_seconds is None:
+                continue
+            # The schedule key outlives a leader change, so a new leader does
+            # not rerun a job that was enqueued moments ago.
+            key = JOB_SCHEDULE_KEY.format(spec.name)
+            if await r.set(key, self.instance_id, nx=True, px=int(spec.interval_seconds * 1000)):
+                await self.enqueue(spec.name)
+        async with r.pipeline(transaction=False) as pipe:
+            pipe.llen(JOB_QUEUE_KEY)
+            pipe.zcard(JOB_DELAYED_KEY)
+            pipe.zcard(JOB_PROCESSING_KEY)
+            queued, delayed, processing = await pipe.execute()
+        JOB_QUEUE_DEPTH.labels('queued').set(queued)
+        JOB_QUEUE_DEPTH.labels('delayed').set(delayed)
+        JOB_QUEUE_DEPTH.labels('processing').set(processing)
+
+    async def scheduler(self) -> None:
+        while True:
+            try:
+                r = get_async_redis()
+                self._scripts(r)
+                self.is_leader = bool(await self._acquire_leader(
+                    keys=[JOB_LEADER_KEY],
+                    args=[self.instance_id, int(settings.job_leader_ttl_seconds * 1000)],
+                    client=r,
+                ))
+                if self.is_leader:
+                    await self._schedule(r)
+            except redis.RedisError:
+                self.is_leader = False
+            JOB_LEADER.set(int(self.is_leader))
+            await asyncio.sleep(settings.job_scheduler_tick_seconds)
+
+    def start(self) -> list[asyncio.Task]:
+        tasks = [asyncio.create_task(self.scheduler())]
+        tasks.extend(asyncio.create_task(self.worker()) for _ in range(settings.job_workers))
+        return tasks
+
+    async def release_leadership(self) -> None:
+        if not self.is_leader:
+            return
+        self.is_leader = False
+        JOB_LEADER.set(0)
+        try:
+            r = get_async_redis()
+            await self._release_leader(keys=[JOB_LEADER_KEY], args=[self.instance_id], client=r)
+        except redis.RedisError:
+            pass
+
+
+job_queue = JobQueue()
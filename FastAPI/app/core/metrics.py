@@ -0,0 +1,197 @@
+import os
+import time
+from contextvars import ContextVar
+from typing import Optional
+
+from prometheus_client import (
+    CONTENT_TYPE_LATEST,
+    REGISTRY,
+    CollectorRegistry,
+    Counter,
+    Gauge,
+    Histogram,
+    generate_latest,
+    multiprocess,
+)
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+
+_FAST_BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5)
+_QUERY_COUNT_BUCKETS = (0, 1, 2, 3, 5, 10, 20, 50, 100)
+
+HTTP_REQUEST_DURATION = Histogram(
+    'http_request_duration_seconds',
+    'HTTP request latency by route template',
+    ['method', 'route', 'status'],
+    buckets=_FAST_BUCKETS,
+)
+HTTP_REQUESTS_IN_PROGRESS = Gauge('http_requests_in_progress', 'HTTP requests being served')
+
+CACHE_LOOKUPS = Counter(
+    'cache_lookups_total',
+    'Cache lookups by namespace and result (l1_hit, hit, negative, miss)',
+    ['namespace', 'result'],
+)
+CACHE_ERRORS = Counter('cache_errors_total', 'Redis errors seen by the cache', ['op'])
+CACHE_OP_DURATION = Histogram(
+    'cache_operation_duration_seconds',
+    'Redis round trip per cache operation',
+    ['op'],
+    buckets=_FAST_BUCKETS,
+)
+
+DB_QUERY_DURATION = Histogram(
+    'db_query_duration_seconds',
+    'SQL statement latency by statement type',
+    ['statement'],
+    buckets=_FAST_BUCKETS,
+)
+DB_QUERIES_PER_REQUEST = Histogram(
+    'db_queries_per_request',
+    'SQL statements executed while serving one request',
+    ['route'],
+    buckets=_QUERY_COUNT_BUCKETS,
+)
+DB_TIME_PER_REQUEST = Histogram(
+    'db_time_per_request_seconds',
+    'Time spent in SQL while serving one request',
+    ['route'],
+    buckets=_FAST_BUCKETS,
+)
+
+CLEANUP_DURATION = Histogram(
+    'cleanup_duration_seconds',
+    'Inactive link cleanup run time',
+    buckets=(0.1, 1, 5, 15, 60, 300, 900, 3600),
+)
+CLEANUP_ROWS = Counter('cleanup_rows_deleted_total', 'Links deleted by the inactive link cleanup')
+CLEANUP_LAST_SUCCESS = Gauge('cleanup_last_success_timestamp_seconds', 'When the cleanup last finished')
+
+JOB_RUNS = Counter(
+    'job_runs_total',
+    'Background job runs by outcome (success, retry, failed)',
+    ['job', 'outcome'],
+)
+JOB_DURATION = Histogram(
+    'job_duration_seconds',
+    'Background job run time',
+    ['job'],
+    buckets=(0.01, 0.1, 0.5, 1, 5, 15, 60, 300, 900, 3600),
+)
+JOB_QUEUE_DEPTH = Gauge(
+    'job_queue_depth',
+    'Jobs in the queue by state (queued, delayed, processing)',
+    ['state'],
+)
+JOB_LEADER = Gauge('job_scheduler_leader', 'Whether this process holds the job scheduler lock')
+
+RATE_LIMITED = Counter('rate_limited_total', 'Requests rejected with 429 by the rate limiter', ['limit'])
+
+_STATEMENTS = ('select', 'insert', 'update', 'delete')
+UNMATCHED_ROUTE = 'unmatched'
+
+
+class QueryStats:
+    __slots__ = ('count', 'seconds')
+
+    def __init__(self):
+        self.count = 0
+        self.seconds = 0.0
+
+
+# Set by the middleware for the duration of a request. Sync endpoints run in
+# a worker thread with a copy of the context, so they mutate the same object.
+_request_queries: ContextVar[Optional[QueryStats]] = ContextVar('request_queries', default=None)
+
+
+def _statement_type(statement: str) -> str:
+    verb = statement.lstrip()[:6].lower()
+    return verb if verb in _STATEMENTS else 'other'
+
+
+def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany) -> None:
+    conn.info.setdefault('query_started', []).append(time.perf_counter())
+
+
+def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany) -> None:
+    started = conn.info.get('query_started')
+    if not started:
+        return
+    elapsed = time.perf_counter() - started.pop()
+    DB_QUERY_DURATION.labels(_statement_type(statement)).observe(elapsed)
+    stats = _request_queries.get()
+    if stats is not None:
+        stats.count += 1
+        stats.seconds += elapsed
+
+
+def _handle_error(context) -> None:
+    started = context.connection.info.get('query_started') if context.connection is not None else None
+    if started:
+        started.pop()
+
+
+def instrument_engine(engine: Engine) -> None:
+    event.listen(engine, 'before_cursor_execute', _before_cursor_execute)
+    event.listen(engine, 'after_cursor_execute', _after_cursor_execute)
+    event.listen(engine, 'handle_error', _handle_error)
+
+
+def record_cache_lookups(namespace: str, result: str, count: int = 1) -> None:
+    if count:
+        CACHE_LOOKUPS.labels(namespace, result).inc(count)
+
+
+def cache_lookup_totals() -> dict[str, float]:
+    totals: dict[str, float] = {}
+    for family in CACHE_LOOKUPS.collect():
+        for sample in family.samples:
+            if sample.name.endswith('_total'):
+                result = sample.labels['result']
+                totals[result] = totals.get(result, 0) + sample.value
+    return totals
+
+
+class MetricsMiddleware:
+    # Plain ASGI middleware: BaseHTTPMiddleware would add a task and a memory
+    # stream per request on the redirect path.
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope['type'] != 'http':
+            await self.app(scope, receive, send)
+            return
+
+        status_code = 500
+
+        async def send_with_status(message):
+            nonlocal status_code
+            if message['type'] == 'http.response.start':
+                status_code = message['status']
+            await send(message)
+
+        stats = QueryStats()
+        token = _request_queries.set(stats)
+        HTTP_REQUESTS_IN_PROGRESS.inc()
+        started = time.perf_counter()
+        try:
+            await self.app(scope, receive, send_with_status)
+        finally:
+            elapsed = time.perf_counter() - started
+            HTTP_REQUESTS_IN_PROGRESS.dec()
+            _request_queries.reset(token)
+            # The router stores the matched route in the scope; label by its
+            # template so /links/{short_code} stays a single series.
+            route = getattr(scope.get('route'), 'path', None) or UNMATCHED_ROUTE
+            HTTP_REQUEST_DURATION.labels(scope['method'], route, str(status_code)).observe(elapsed)
+            DB_QUERIES_PER_REQUEST.labels(route).observe(stats.count)
+            DB_TIME_PER_REQUEST.labels(route).observe(stats.seconds)
+
+
+def render_metrics() -> tuple[bytes, str]:
+    registry = REGISTRY
+    if os.environ.get('PROMETHEUS_MULTIPROC_DIR'):
+        registry = CollectorRegistry()
+        multiprocess.MultiProcessCollector(registry)
+    return generate_latest(registry), CONTENT_TYPE_LATEST
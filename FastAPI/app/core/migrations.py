@@ -0,0 +1,36 @@
+from sqlalchemy import inspect, select, text, update
+from sqlalchemy.engine import Engine
+from sqlalchemy.schema import CreateIndex
+from sqlalchemy.orm import Session
+
+from app.core.urls import url_fields
+
+LINK_URL_COLUMNS = ('normalized_url', 'url_hash', 'domain')
+
+
+def migrate(engine: Engine) -> None:
+    from app.models.link import Link
+
+    existing = {column['name'] for column in inspect(engine).get_columns('links')}
+    with engine.begin() as conn:
+        for name in LINK_URL_COLUMNS:
+            if name not in existing:
+                column_type = Link.__table__.c[name].type.compile(dialect=engine.dialect)
+                conn.execute(text(f'ALTER TABLE links ADD COLUMN {name} {column_type}'))
+        for index in Link.__table__.indexes:
+            conn.execute(CreateIndex(index, if_not_exists=True))
+
+
+def backfill_url_fields(db: Session, batch_size: int = 1000) -> int:
+    from app.models.link import Link
+
+    total = 0
+    while True:
+        rows = db.execute(
+            select(Link.id, Link.original_url).where(Link.url_hash.is_(None)).limit(batch_size)
+        ).all()
+        if not rows:
+            return total
+        db.execute(update(Link), [{'id': link_id, **url_fields(url)} for link_id, url in rows])
+        db.commit()
+        total += len(rows)
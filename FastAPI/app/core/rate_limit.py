@@ -0,0 +1,174 @@
+import math
+import threading
+import time
+from collections import OrderedDict
+from dataclasses import dataclass
+from typing import Callable, Optional
+
+import redis
+from fastapi import Depends, HTTPException, Request, status
+from fastapi.security import HTTPAuthorizationCredentials
+
+from app.config import settings
+from app.core.cache import get_async_redis, get_redis
+from app.core.metrics import RATE_LIMITED
+from app.core.security import _user_id, decode_token, security
+
+RATE_LIMIT_KEY = 'ratelimit:{}:{}'
+
+_PERIODS = {'second': 1, 'minute': 60, 'hour': 3600, 'day': 86400}
+
+# Token bucket in one round trip: refill by elapsed time, take a token if
+# there is one, otherwise report how long until the next one. Returns the
+# wait in milliseconds, 0 when the request is admitted. The clock is the
+# Redis server's, so app hosts with skewed clocks share one timeline.
+_TOKEN_BUCKET_SCRIPT = """
+local capacity = tonumber(ARGV[1])
+local rate = tonumber(ARGV[2])
+local time = redis.call('TIME')
+local now = tonumber(time[1]) * 1000 + math.floor(tonumber(time[2]) / 1000)
+local state = redis.call('HMGET', KEYS[1], 'tokens', 'ts')
+local tokens = tonumber(state[1]) or capacity
+local ts = tonumber(state[2]) or now
+tokens = math.min(capacity, tokens + math.max(0, now - ts) * rate)
+local wait = 0
+if tokens >= 1 then
+    tokens = tokens - 1
+else
+    wait = math.ceil((1 - tokens) / rate)
+end
+redis.call('HSET', KEYS[1], 'tokens', tostring(tokens), 'ts', tostring(now))
+redis.call('PEXPIRE', KEYS[1], math.ceil(capacity / rate))
+return wait
+"""
+
+
+@dataclass(frozen=True)
+class RateLimit:
+    capacity: int
+    period_seconds: float
+
+    @property
+    def per_ms(self) -> float:
+        return self.capacity / (self.period_seconds * 1000)
+
+
+def parse_rate_limit(spec: str) -> RateLimit:
+    count, _, period = spec.partition('/')
+    period = period.strip().lower()
+    seconds = _PERIODS.get(period.rstrip('s')) if not period.isdigit() else int(period)
+    if not seconds or not count.strip().isdigit() or int(count) <= 0:
+        raise ValueError(f'Invalid rate limit: {spec!r}, expected e.g. "60/minute"')
+    return RateLimit(int(count), seconds)
+
+
+class LocalTokenBuckets:
+    # Per-process fallback while Redis is unreachable; each worker then
+    # enforces the full limit on its own.
+    def __init__(self, max_keys: int):
+        self.max_keys = max_keys
+        self._buckets: OrderedDict[str, tuple[float, float]] = OrderedDict()
+        self._lock = threading.Lock()
+
+    def take(self, key: str, limit: RateLimit, now_ms: float) -> int:
+        with self._lock:
+            tokens, updated = self._buckets.get(key, (limit.capacity, now_ms))
+            tokens = min(limit.capacity, tokens + max(0.0, now_ms - updated) * limit.per_ms)
+            wait = 0
+            if tokens >= 1:
+                tokens -= 1
+            else:
+                wait = math.ceil((1 - tokens) / limit.per_ms)
+            self._buckets[key] = (tokens, now_ms)
+            self._buckets.move_to_end(key)
+            while len(self._buckets) > self.max_keys:
+                self._buckets.popitem(last=False)
+            return wait
+
+
+class RateLimiter:
+    def __init__(self):
+        self._limits = {name: parse_rate_limit(spec) for name, spec in settings.rate_limits.items()}
+        self._local = LocalTokenBuckets(settings.rate_limit_local_max_keys)
+        self._script = None
+        self._async_script = None
+
+    def limit_for(self, name: str) -> Optional[RateLimit]:
+        return self._limits.get(name) if settings.rate_limit_enabled else None
+
+    @staticmethod
+    def _args(limit: RateLimit) -> list:
+        return [limit.capacity, limit.per_ms]
+
+    def hit(self, name: str, identity: str) -> int:
+        limit = self.limit_for(name)
+        if limit is None:
+            return 0
+        key = RATE_LIMIT_KEY.format(name, identity)
+        try:
+            r = get_redis()
+            if self._script is None:
+                self._script = r.register_script(_TOKEN_BUCKET_SCRIPT)
+            return int(self._script(keys=[key], args=self._args(limit), client=r))
+        except redis.RedisError:
+            return self._local.take(key, limit, time.time() * 1000)
+
+    async def hit_async(self, name: str, identity: str) -> int:
+        limit = self.limit_for(name)
+        if limit is None:
+            return 0
+        key = RATE_LIMIT_KEY.format(name, identity)
+        try:
+            r = get_async_redis()
+            if self._async_script is None:
+                self._async_script = r.register_script(_TOKEN_BUCKET_SCRIPT)
+            return int(await self._async_script(keys=[key], args=self._args(limit), client=r))
+        except redis.RedisError:
+            return self._local.take(key, limit, time.time() * 1000)
+
+
+rate_limiter = RateLimiter()
+
+
+def client_identity(request: Request, credentials: Optional[HTTPAuthorizationCredentials]) -> str:
+    # The verified token subject comes from the in-process token cache, so
+    # keying by user never costs a database round trip.
+    if credentials:
+        payload = decode_token(credentials.credentials)
+        user_id = _user_id(payload) if payload else None
+        if user_id:
+            return f'user:{user_id}'
+    return f'ip:{request.client.host if request.client else "unknown"}'
+
+
+def _reject(name: str, wait_ms: int) -> None:
+    RATE_LIMITED.labels(name).inc()
+    raise HTTPException(
+        status_code=status.HTTP_429_TOO_MANY_REQUESTS,
+        detail='Rate limit exceeded',
+        headers={'Retry-After': str(max(1, math.ceil(wait_ms / 1000)))},
+    )
+
+
+def rate_limit(name: str) -> Callable:
+    def dependency(
+        request: Request,
+        credentials: Optional[HTTPAuthorizationCredentials] = Depends(security),
+    ) -> None:
+        wait_ms = rate_limiter.hit(name, client_identity(request, credentials))
+        if wait_ms:
+            _reject(name, wait_ms)
+
+    return dependency
+
+
+def rate_limit_async(name: str) -> Callable:
+    async def dependency(
+        request: Request,
+        credentials: Optional[HTTPAuthorizationCredentials] = Depends(security),
+    ) -> None:
+        wait_ms = await rate_limiter.hit_async(name, client_identity(request, credentials))
+        if wait_ms:
+            _reject(name, wait_ms)
+
+    return dependency
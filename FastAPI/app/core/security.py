@@ -1,5 +1,14 @@
+import asyncio
+import hashlib
+import multiprocessing
+import threading
+import time
+from collections import OrderedDict
+from concurrent.futures import Future, ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from dataclasses import dataclass
 from datetime import datetime, timedelta
-from typing import Optional
+from typing import Callable, Optional
 
 import bcrypt
 from jose import JWTError, jwt
@@ -8,20 +17,120 @@ from fastapi.security import HTTPBearer, HTTPAuthorizationCredentials
 
 from app.config import settings
 from app.models.user import User
-from app.core.database import get_db
+from app.core.cache import async_cache, cache
+from app.core.database import get_db, get_async_db
+from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.orm import Session
 
+CACHE_NS_USER = 'user'
+
 security = HTTPBearer(auto_error=False)
 
 
-def get_password_hash(password: str) -> str:
-    pwd_bytes = password.encode('utf-8')[:72]
-    return bcrypt.hashpw(pwd_bytes, bcrypt.gensalt()).decode('utf-8')
+def _hash_args(password: str) -> tuple[bytes, bytes]:
+    return password.encode('utf-8')[:72], bcrypt.gensalt(rounds=settings.bcrypt_rounds)
+
+
+def _verify_args(plain_password: str, hashed_password: str) -> tuple[bytes, bytes]:
+    return plain_password.encode('utf-8')[:72], hashed_password.encode('utf-8')
+
+
+class PasswordHasher:
+    # bcrypt runs in a separate process pool so a burst of logins cannot
+    # starve the threads that serve redirects. At most queue_limit calls may
+    # be queued or running; beyond that callers get 429 immediately instead
+    # of piling up. Workers come from a forkserver, not a fork of this
+    # process, so they inherit none of its sockets, engines or threads.
+    def __init__(self, workers: int, queue_limit: int):
+        self.workers = workers
+        self._slots = threading.BoundedSemaphore(queue_limit)
+        self._pool: Optional[ProcessPoolExecutor] = None
+        self._lock = threading.Lock()
+
+    def start(self) -> None:
+        if self.workers > 0:
+            self._executor()
+
+    def _executor(self) -> ProcessPoolExecutor:
+        with self._lock:
+            if self._pool is None:
+                self._pool = ProcessPoolExecutor(
+                    max_workers=self.workers,
+                    mp_context=multiprocessing.get_context('forkserver'),
+                )
+            return self._pool
+
+    def _discard(self, pool: ProcessPoolExecutor) -> None:
+        # A worker killed mid-call (OOM killer, segfault) breaks the whole
+        # pool for good. The pool that raised is replaced unless another
+        # caller already did so.
+        with self._lock:
+            if self._pool is pool:
+                self._pool = None
+        pool.shutdown(wait=False, cancel_futures=True)
+
+    def _submit(self, fn: Callable, *args) -> tuple[Future, Optional[ProcessPoolExecutor]]:
+        if not self._slots.acquire(blocking=False):
+            raise HTTPException(
+                status_code=status.HTTP_429_TOO_MANY_REQUESTS,
+                detail='Too many authentication requests, try again later',
+                headers={'Retry-After': '1'},
+            )
+        pool = None
+        try:
+            if self.workers <= 0:
+                future = Future()
+                future.set_result(fn(*args))
+            else:
+                pool = self._executor()
+                try:
+                    future = pool.submit(fn, *args)
+                except BrokenProcessPool:
+                    self._discard(pool)
+                    pool = self._executor()
+                    future = pool.submit(fn, *args)
+        except BaseException:
+            self._slots.release()
+            raise
+        future.add_done_callback(lambda _: self._slots.release())
+        return future, pool
+
+    def _run(self, fn: Callable, *args):
+        future, pool = self._submit(fn, *args)
+        try:
+            return future.result()
+        except BrokenProcessPool:
+            self._discard(pool)
+            return self._submit(fn, *args)[0].result()
 
+    async def _run_async(self, fn: Callable, *args):
+        future, pool = self._submit(fn, *args)
+        try:
+            return await asyncio.wrap_future(future)
+        except BrokenProcessPool:
+            self._discard(pool)
+            return await asyncio.wrap_future(self._submit(fn, *args)[0])
 
-def verify_password(plain_password: str, hashed_password: str) -> bool:
-    pwd_bytes = plain_password.encode('utf-8')[:72]
-    return bcrypt.checkpw(pwd_bytes, hashed_password.encode('utf-8'))
+    def hash(self, password: str) -> str:
+        return self._run(bcrypt.hashpw, *_hash_args(password)).decode('utf-8')
+
+    async def hash_async(self, password: str) -> str:
+        return (await self._run_async(bcrypt.hashpw, *_hash_args(password))).decode('utf-8')
+
+    def verify(self, plain_password: str, hashed_password: str) -> bool:
+        return self._run(bcrypt.checkpw, *_verify_args(plain_password, hashed_password))
+
+    async def verify_async(self, plain_password: str, hashed_password: str) -> bool:
+        return await self._run_async(bcrypt.checkpw, *_verify_args(plain_password, hashed_password))
+
+    def shutdown(self) -> None:
+        with self._lock:
+            if self._pool is not None:
+                self._pool.shutdown(wait=False, cancel_futures=True)
+                self._pool = None
+
+
+password_hasher = PasswordHasher(settings.password_hash_workers, settings.password_hash_queue_limit)
 
 
 def create_access_token(data: dict, expires_delta: Optional[timedelta] = None) -> str:
@@ -31,33 +140,171 @@ def create_access_token(data: dict, expires_delta: Optional[timedelta] = None) -
     return jwt.encode(to_encode, settings.secret_key, algorithm=settings.algorithm)
 
 
+@dataclass(slots=True, frozen=True)
+class Principal:
+    id: int
+    email: str
+
+
+class TokenCache:
+    # Verified token claims keyed by the token's SHA-256, kept until the
+    # token's own exp claim so a cached entry never outlives the token.
+    def __init__(self, max_entries: int):
+        self.max_entries = max_entries
+        self._entries: OrderedDict[str, tuple[float, dict]] = OrderedDict()
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def _key(token: str) -> str:
+        return hashlib.sha256(token.encode('utf-8')).hexdigest()
+
+    def get(self, token: str) -> Optional[dict]:
+        key = self._key(token)
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+            if entry[0] <= time.time():
+                del self._entries[key]
+                return None
+            self._entries.move_to_end(key)
+            return entry[1]
+
+    def set(self, token: str, payload: dict) -> None:
+        exp = payload.get('exp')
+        if not isinstance(exp, (int, float)):
+            return
+        key = self._key(token)
+        with self._lock:
+            self._entries[key] = (exp, payload)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+
+
+token_cache = TokenCache(settings.token_cache_max_entries)
+
+
 def decode_token(token: str) -> Optional[dict]:
+    payload = token_cache.get(token)
+    if payload is not None:
+        return payload
     try:
-        return jwt.decode(token, settings.secret_key, algorithms=[settings.algorithm])
+        payload = jwt.decode(token, settings.secret_key, algorithms=[settings.algorithm])
     except JWTError:
         return None
+    token_cache.set(token, payload)
+    return payload
+
+
+def _user_id(payload: dict) -> Optional[int]:
+    try:
+        return int(payload.get('sub'))
+    except (TypeError, ValueError):
+        return None
+
+
+def _principal_payload(user: Optional[User]) -> Optional[dict]:
+    return {'id': user.id, 'email': user.email} if user else None
+
+
+def _load_principal(db: Session, user_id: int) -> Optional[Principal]:
+    payload = cache.ns_get_or_load(
+        CACHE_NS_USER,
+        str(user_id),
+        lambda: _principal_payload(db.get(User, user_id)),
+        ttl=settings.user_cache_ttl_seconds,
+        negative_ttl=settings.negative_cache_ttl_seconds,
+    )
+    return Principal(**payload) if payload else None
+
+
+async def _load_principal_async(db: AsyncSession, user_id: int) -> Optional[Principal]:
+    async def load() -> Optional[dict]:
+        return _principal_payload(await db.get(User, user_id))
+
+    payload = await async_cache.ns_get_or_load(
+        CACHE_NS_USER,
+        str(user_id),
+        load,
+        ttl=settings.user_cache_ttl_seconds,
+        negative_ttl=settings.negative_cache_ttl_seconds,
+    )
+    return Principal(**payload) if payload else None
+
+
+def invalidate_principal(user_id: int) -> None:
+    cache.ns_delete(CACHE_NS_USER, str(user_id))
+
+
+async def invalidate_principal_async(user_id: int) -> None:
+    await async_cache.ns_delete(CACHE_NS_USER, str(user_id))
 
 
 def get_current_user_optional(
     credentials: Optional[HTTPAuthorizationCredentials] = Depends(security),
     db: Session = Depends(get_db),
-) -> Optional[User]:
+) -> Optional[Principal]:
     if not credentials:
         return None
     payload = decode_token(credentials.credentials)
     if not payload:
         return None
-    user_id = payload.get('sub')
+    user_id = _user_id(payload)
     if not user_id:
         return None
-    user = db.query(User).filter(User.id == int(user_id)).first()
-    return user
+    return _load_principal(db, user_id)
 
 
 def get_current_user_required(
     credentials: Optional[HTTPAuthorizationCredentials] = Depends(security),
     db: Session = Depends(get_db),
-) -> User:
+) -> Principal:
+    if not credentials:
+        raise HTTPException(
+            status_code=status.HTTP_401_UNAUTHORIZED,
+            detail='Not authenticated',
+            headers={'WWW-Authenticate': 'Bearer'},
+        )
+    payload = decode_token(credentials.credentials)
+    if not payload:
+        raise HTTPException(
+            status_code=status.HTTP_401_UNAUTHORIZED,
+            detail='Invalid or expired token',
+            headers={'WWW-Authenticate': 'Bearer'},
+        )
+    user_id = _user_id(payload)
+    if not user_id:
+        raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED, detail='Invalid token')
+    user = _load_principal(db, user_id)
+    if not user:
+        raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED, detail='User not found')
+    return user
+
+
+async def get_current_user_optional_async(
+    credentials: Optional[HTTPAuthorizationCredentials] = Depends(security),
+    db: AsyncSession = Depends(get_async_db),
+) -> Optional[Principal]:
+    if not credentials:
+        return None
+    payload = decode_token(credentials.credentials)
+    if not payload:
+        return None
+    user_id = _user_id(payload)
+    if not user_id:
+        return None
+    return await _load_principal_async(db, user_id)
+
+
+async def get_current_user_required_async(
+    credentials: Optional[HTTPAuthorizationCredentials] = Depends(security),
+    db: AsyncSession = Depends(get_async_db),
+) -> Principal:
     if not credentials:
         raise HTTPException(
             status_code=status.HTTP_401_UNAUTHORIZED,
@@ -71,10 +318,10 @@ def get_current_user_required(
             detail='Invalid or expired token',
             headers={'WWW-Authenticate': 'Bearer'},
         )
-    user_id = payload.get('sub')
+    user_id = _user_id(payload)
     if not user_id:
         raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED, detail='Invalid token')
-    user = db.query(User).filter(User.id == int(user_id)).first()
+    user = await _load_principal_async(db, user_id)
     if not user:
         raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED, detail='User not found')
     return user
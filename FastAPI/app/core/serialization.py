@@ -0,0 +1,40 @@
+import json
+from dataclasses import dataclass
+from typing import Any, Callable
+
+import orjson
+
+from app.config import settings
+
+
+@dataclass(frozen=True)
+class Serializer:
+    name: str
+    dumps: Callable[[Any], str]
+    loads: Callable[[str], Any]
+
+
+def _orjson_dumps(value: Any) -> str:
+    return orjson.dumps(value, default=str, option=orjson.OPT_NON_STR_KEYS).decode('utf-8')
+
+
+# Both produce JSON, so switching CACHE_SERIALIZER needs no cache flush: each
+# reads what the other wrote. orjson.JSONDecodeError subclasses the stdlib one.
+SERIALIZERS = {
+    'json': Serializer('json', lambda value: json.dumps(value, default=str), json.loads),
+    'orjson': Serializer('orjson', _orjson_dumps, orjson.loads),
+}
+
+
+def get_serializer(name: str) -> Serializer:
+    try:
+        return SERIALIZERS[name]
+    except KeyError:
+        raise ValueError(f'Unknown cache serializer: {name}') from None
+
+
+def dumps_response(value: Any) -> bytes:
+    return orjson.dumps(value, option=orjson.OPT_NON_STR_KEYS)
+
+
+serializer = get_serializer(settings.cache_serializer)
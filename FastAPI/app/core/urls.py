@@ -0,0 +1,31 @@
+import hashlib
+from typing import Optional
+from urllib.parse import urlsplit
+
+
+def normalize_url(url: str) -> str:
+    normalized = url.strip().lower()
+    if not normalized.startswith(('http://', 'https://')):
+        normalized = 'https://' + normalized
+    return normalized
+
+
+def url_hash(normalized_url: str) -> int:
+    digest = hashlib.sha256(normalized_url.encode('utf-8')).digest()
+    return int.from_bytes(digest[:8], 'big', signed=True)
+
+
+def url_domain(normalized_url: str) -> Optional[str]:
+    try:
+        return urlsplit(normalized_url).hostname
+    except ValueError:
+        return None
+
+
+def url_fields(url: str) -> dict:
+    normalized = normalize_url(url)
+    return {
+        'normalized_url': normalized,
+        'url_hash': url_hash(normalized),
+        'domain': url_domain(normalized),
+    }
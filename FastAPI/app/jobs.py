@@ -0,0 +1,106 @@
+import asyncio
+import logging
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Optional
+
+from app.config import settings
+from app.core.database import ReadSessionLocal, SessionLocal
+from app.core.jobs import JobSpec, job_queue
+from app.core.metrics import CLEANUP_DURATION, CLEANUP_LAST_SUCCESS, CLEANUP_ROWS
+from app.core.migrations import backfill_url_fields
+from app.services import LinkService, warm_cache
+
+logger = logging.getLogger(__name__)
+
+# Cleanup can run for minutes on a large table; keep it off the default
+# executor so click flushes and sync endpoints are not starved.
+_cleanup_executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix='cleanup')
+
+
+def run_cleanup_inactive() -> int:
+    started = time.perf_counter()
+    db = SessionLocal()
+    try:
+        deleted = LinkService(db, base_url='').cleanup_inactive()
+    finally:
+        db.close()
+        CLEANUP_DURATION.observe(time.perf_counter() - started)
+    CLEANUP_ROWS.inc(deleted)
+    CLEANUP_LAST_SUCCESS.set_to_current_time()
+    logger.info('Inactive link cleanup deleted %d links in %.1fs', deleted, time.perf_counter() - started)
+    return deleted
+
+
+def run_url_backfill() -> None:
+    db = SessionLocal()
+    try:
+        backfill_url_fields(db, batch_size=settings.url_backfill_batch_size)
+    finally:
+        db.close()
+
+
+def run_cache_warmup(limit: Optional[int] = None, batch_size: Optional[int] = None) -> int:
+    started = time.perf_counter()
+    db = (ReadSessionLocal or SessionLocal)()
+    try:
+        warmed = warm_cache(db, limit, batch_size)
+    finally:
+        db.close()
+    logger.info('Cache warm-up stored %d links in %.1fs', warmed, time.perf_counter() - started)
+    return warmed
+
+
+def run_click_flush() -> None:
+    db = SessionLocal()
+    try:
+        LinkService(db, base_url='').flush_clicks()
+    finally:
+        db.close()
+
+
+def run_local_click_flush() -> None:
+    db = SessionLocal()
+    try:
+        LinkService(db, base_url='').flush_local_clicks()
+    finally:
+        db.close()
+
+
+async def drain_local_clicks() -> None:
+    # Clicks recorded while Redis was unreachable stay in this process's
+    # memory; the queued flush runs in whichever worker picks it up, so
+    # every process drains its own buffers on its own timer.
+    loop = asyncio.get_running_loop()
+    while True:
+        await asyncio.sleep(settings.click_flush_interval_seconds)
+        try:
+            await loop.run_in_executor(None, run_local_click_flush)
+        except Exception:
+            logger.exception('Local click buffer flush failed')
+
+
+CLEANUP_JOB = job_queue.register(JobSpec(
+    name='cleanup_inactive',
+    func=run_cleanup_inactive,
+    interval_seconds=settings.cleanup_interval_hours * 3600,
+    executor=_cleanup_executor,
+))
+CLICK_FLUSH_JOB = job_queue.register(JobSpec(
+    name='flush_clicks',
+    func=run_click_flush,
+    interval_seconds=settings.click_flush_interval_seconds,
+    timeout_seconds=settings.click_flush_lock_seconds,
+))
+URL_BACKFILL_JOB = job_queue.register(JobSpec(
+    name='url_backfill',
+    func=run_url_backfill,
+    local_fallback=True,
+))
+CACHE_WARMUP_JOB = job_queue.register(JobSpec(
+    name='cache_warmup',
+    func=run_cache_warmup,
+    # Periodic so that a Redis flush, which also drops the schedule key,
+    # triggers a fresh warm-up on the next scheduler tick.
+    interval_seconds=settings.cache_warmup_interval_hours * 3600 if settings.cache_warmup_enabled else None,
+))
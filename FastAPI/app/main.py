@@ -1,42 +1,72 @@
 import asyncio
+import logging
 from contextlib import asynccontextmanager
 
-from fastapi import FastAPI
+from fastapi import FastAPI, Response
+from fastapi.responses import JSONResponse
+from uvicorn.middleware.proxy_headers import ProxyHeadersMiddleware
 
 from app.config import settings
-from app.core.database import init_db, SessionLocal
+from app.core.cache import close_async_redis, listen_for_invalidations
+from app.core.database import init_db
+from app.core.health import health_sampler
+from app.core.jobs import job_queue
+from app.core.metrics import MetricsMiddleware, render_metrics
+from app.core.security import password_hasher
 from app.api.v1 import api_router
-from app.services import LinkService
+from app.jobs import CACHE_WARMUP_JOB, URL_BACKFILL_JOB, drain_local_clicks, run_click_flush
+from app.services import cleanup_progress, warmup_progress
 
+logger = logging.getLogger(__name__)
 
-def _run_cleanup_inactive() -> None:
-    db = SessionLocal()
-    try:
-        LinkService(db, base_url='').cleanup_inactive()
-    finally:
-        db.close()
+health_sampler.add_reporter('cleanup', cleanup_progress.current)
+health_sampler.add_reporter('warmup', warmup_progress.current)
 
 
-async def _cleanup_loop() -> None:
-    loop = asyncio.get_running_loop()
-    await loop.run_in_executor(None, _run_cleanup_inactive)
-    while True:
-        await asyncio.sleep(settings.cleanup_interval_hours * 3600)
-        await loop.run_in_executor(None, _run_cleanup_inactive)
+async def _enqueue_startup_jobs() -> None:
+    # Enqueued by every worker on startup (i.e. after each deploy); the
+    # uniqueness key lets only one copy of each run at a time in the cluster.
+    names = [URL_BACKFILL_JOB.name]
+    if settings.cache_warmup_enabled:
+        names.append(CACHE_WARMUP_JOB.name)
+    for name in names:
+        try:
+            await job_queue.enqueue(name)
+        except Exception:
+            logger.exception('Could not enqueue job %s', name)
 
 
 @asynccontextmanager
 async def lifespan(app: FastAPI):
     init_db()
-    task = asyncio.create_task(_cleanup_loop())
+    # Started before any request so the forkserver and its workers are up
+    # by the first login instead of being spawned on the request path.
+    password_hasher.start()
+    tasks = job_queue.start()
+    tasks.append(asyncio.create_task(_enqueue_startup_jobs()))
+    tasks.append(asyncio.create_task(health_sampler.run()))
+    tasks.append(asyncio.create_task(drain_local_clicks()))
+    if settings.l1_cache_enabled:
+        tasks.append(asyncio.create_task(listen_for_invalidations()))
     try:
         yield
     finally:
-        task.cancel()
+        for task in tasks:
+            task.cancel()
+        for task in tasks:
+            try:
+                await task
+            except asyncio.CancelledError:
+                pass
+        await job_queue.release_leadership()
+        # Clicks buffered locally while Redis was down belong to this process
+        # only; drain them before exit.
         try:
-            await task
-        except asyncio.CancelledError:
-            pass
+            await asyncio.get_running_loop().run_in_executor(None, run_click_flush)
+        except Exception:
+            logger.exception('Click counter flush failed')
+        await close_async_redis()
+        password_hasher.shutdown()
 
 
 app = FastAPI(
@@ -46,7 +76,33 @@ app = FastAPI(
 
 app.include_router(api_router, prefix='/api/v1')
 
+if settings.metrics_enabled:
+    app.add_middleware(MetricsMiddleware)
+
+    @app.get('/metrics', include_in_schema=False)
+    def metrics():
+        content, media_type = render_metrics()
+        return Response(content=content, media_type=media_type)
+
+# Added last so it runs first: the rate limiter and metrics then see the
+# client address reported by a trusted proxy instead of the proxy's own.
+app.add_middleware(ProxyHeadersMiddleware, trusted_hosts=settings.forwarded_allow_ips)
+
 
 @app.get('/health')
 def health():
+    snapshot = health_sampler.snapshot() or {}
+    return {'status': 'ok', 'cleanup': snapshot.get('cleanup'), 'warmup': snapshot.get('warmup')}
+
+
+# Both read the snapshot kept by the background sampler and never touch the
+# database or Redis themselves.
+@app.get('/health/live')
+async def health_live():
     return {'status': 'ok'}
+
+
+@app.get('/health/ready')
+async def health_ready():
+    ready, body = health_sampler.readiness()
+    return JSONResponse(body, status_code=200 if ready else 503)
@@ -1,4 +1,7 @@
 from app.models.link import Link
 from app.models.user import User
+from app.models.click_rollup import ClickRollup, ClickRollupArchive
+from app.models.click_flush import ClickFlush
+from app.models.link_archive import LinkArchive
 
-__all__ = ['Link', 'User']
+__all__ = ['Link', 'User', 'ClickRollup', 'ClickRollupArchive', 'ClickFlush', 'LinkArchive']
@@ -0,0 +1,12 @@
+from sqlalchemy import Column, DateTime, String
+
+from app.core.database import Base
+
+
+class ClickFlush(Base):
+    # One row per Redis click snapshot written to the database, committed in
+    # the same transaction as the counters it carries.
+    __tablename__ = 'click_flushes'
+
+    id = Column(String(64), primary_key=True)
+    applied_at = Column(DateTime, nullable=False, index=True)
@@ -0,0 +1,54 @@
+from sqlalchemy import (
+    BigInteger,
+    Column,
+    DateTime,
+    ForeignKey,
+    Index,
+    Integer,
+    PrimaryKeyConstraint,
+    String,
+    UniqueConstraint,
+)
+
+from app.core.database import Base
+
+
+class ClickRollup(Base):
+    __tablename__ = 'click_rollups'
+
+    id = Column(BigInteger().with_variant(Integer, 'sqlite'), primary_key=True)
+    link_id = Column(Integer, ForeignKey('links.id', ondelete='CASCADE'), nullable=False)
+    granularity = Column(String(8), nullable=False)
+    bucket = Column(DateTime, nullable=False)
+    referrer = Column(String(255), nullable=False, default='')
+    country = Column(String(2), nullable=False, default='')
+    count = Column(BigInteger, nullable=False, default=0)
+
+    __table_args__ = (
+        UniqueConstraint(
+            'link_id', 'granularity', 'bucket', 'referrer', 'country',
+            name='uq_click_rollups_dimensions',
+        ),
+    )
+
+
+class ClickRollupArchive(Base):
+    # Rollups of links moved to links_archive, written in the same
+    # transaction and partitioned by the same archived_at months, so a
+    # dropped archive month takes its rollups with it.
+    __tablename__ = 'click_rollups_archive'
+
+    id = Column(BigInteger().with_variant(Integer, 'sqlite'), nullable=False)
+    link_id = Column(Integer, nullable=False)
+    granularity = Column(String(8), nullable=False)
+    bucket = Column(DateTime, nullable=False)
+    referrer = Column(String(255), nullable=False, default='')
+    country = Column(String(2), nullable=False, default='')
+    count = Column(BigInteger, nullable=False, default=0)
+    archived_at = Column(DateTime, nullable=False)
+
+    __table_args__ = (
+        PrimaryKeyConstraint('id', 'archived_at', name='pk_click_rollups_archive'),
+        Index('ix_click_rollups_archive_link_id', 'link_id'),
+        {'postgresql_partition_by': 'RANGE (archived_at)'},
+    )
@@ -1,8 +1,11 @@
 from datetime import datetime
-from sqlalchemy import Column, Integer, String, DateTime, ForeignKey, Text
-from sqlalchemy.orm import relationship
+from sqlalchemy import BigInteger, Column, Integer, String, DateTime, ForeignKey, Index, Sequence, Text, func
+from sqlalchemy.orm import relationship, validates
 
 from app.core.database import Base
+from app.core.urls import url_fields
+
+short_code_sequence = Sequence('links_short_code_seq', start=1, metadata=Base.metadata)
 
 
 class Link(Base):
@@ -12,9 +15,22 @@ class Link(Base):
     short_code = Column(String(32), unique=True, nullable=False, index=True)
     original_url = Column(Text, nullable=False)
     created_at = Column(DateTime, default=datetime.utcnow)
-    expires_at = Column(DateTime, nullable=True)
+    expires_at = Column(DateTime, nullable=True, index=True)
     click_count = Column(Integer, default=0)
     last_clicked_at = Column(DateTime, nullable=True)
+    normalized_url = Column(Text, nullable=True)
+    url_hash = Column(BigInteger, nullable=True, index=True)
+    domain = Column(String(255), nullable=True, index=True)
 
     owner_id = Column(Integer, ForeignKey('users.id'), nullable=True, index=True)
     owner = relationship('User', back_populates='links')
+
+    __table_args__ = (
+        Index('ix_links_last_activity', func.coalesce(last_clicked_at, created_at)),
+    )
+
+    @validates('original_url')
+    def _set_url_fields(self, key: str, value: str) -> str:
+        for name, field_value in url_fields(value).items():
+            setattr(self, name, field_value)
+        return value
@@ -0,0 +1,27 @@
+from sqlalchemy import Column, DateTime, Index, Integer, PrimaryKeyConstraint, String, Text
+
+from app.core.database import Base
+
+
+class LinkArchive(Base):
+    # Links moved out of the hot `links` table by the cleanup job. On
+    # PostgreSQL the table is range-partitioned by archived_at month so old
+    # months can be dropped without a long DELETE.
+    __tablename__ = 'links_archive'
+
+    id = Column(Integer, nullable=False)
+    short_code = Column(String(32), nullable=False)
+    original_url = Column(Text, nullable=False)
+    created_at = Column(DateTime, nullable=True)
+    expires_at = Column(DateTime, nullable=True)
+    click_count = Column(Integer, nullable=False, default=0)
+    last_clicked_at = Column(DateTime, nullable=True)
+    owner_id = Column(Integer, nullable=True)
+    archived_at = Column(DateTime, nullable=False)
+    reason = Column(String(16), nullable=False)
+
+    __table_args__ = (
+        PrimaryKeyConstraint('id', 'archived_at', name='pk_links_archive'),
+        Index('ix_links_archive_short_code', 'short_code'),
+        {'postgresql_partition_by': 'RANGE (archived_at)'},
+    )
@@ -1,18 +1,24 @@
 from app.schemas.link import (
+    ArchivedLinkResponse,
     LinkCreate,
     LinkUpdate,
     LinkResponse,
     LinkStatsResponse,
     LinkSearchResponse,
+    LinkTimeseriesResponse,
+    TimeseriesPoint,
 )
 from app.schemas.user import UserCreate, UserLogin, UserResponse, Token
 
 __all__ = [
+    'ArchivedLinkResponse',
     'LinkCreate',
     'LinkUpdate',
     'LinkResponse',
     'LinkStatsResponse',
     'LinkSearchResponse',
+    'LinkTimeseriesResponse',
+    'TimeseriesPoint',
     'UserCreate',
     'UserLogin',
     'UserResponse',
@@ -60,3 +60,31 @@ class LinkSearchResponse(BaseModel):
     expires_at: Optional[datetime] = None
 
     model_config = {'from_attributes': True}
+
+
+class ArchivedLinkResponse(BaseModel):
+    short_code: str
+    original_url: str
+    created_at: Optional[datetime] = None
+    expires_at: Optional[datetime] = None
+    click_count: int
+    last_clicked_at: Optional[datetime] = None
+    archived_at: datetime
+    reason: str
+
+    model_config = {'from_attributes': True}
+
+
+class TimeseriesPoint(BaseModel):
+    bucket: datetime
+    count: int
+    referrer: Optional[str] = None
+    country: Optional[str] = None
+
+
+class LinkTimeseriesResponse(BaseModel):
+    short_code: str
+    granularity: str
+    start: datetime
+    end: datetime
+    points: list[TimeseriesPoint]
@@ -1,4 +1,18 @@
+from app.services.cleanup_progress import cleanup_progress
+from app.services.click_counter import click_counter
 from app.services.link_service import LinkService
 from app.services.user_service import UserService
+from app.services.async_link_service import AsyncLinkService
+from app.services.async_user_service import AsyncUserService
+from app.services.cache_warmup import warm_cache, warmup_progress
 
-__all__ = ['LinkService', 'UserService']
+__all__ = [
+    'LinkService',
+    'UserService',
+    'AsyncLinkService',
+    'AsyncUserService',
+    'click_counter',
+    'cleanup_progress',
+    'warm_cache',
+    'warmup_progress',
+]
@@ -0,0 +1,294 @@
+from datetime import datetime
+from typing import Optional
+
+from sqlalchemy import select
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.config import settings
+from app.core.urls import normalize_url, url_domain, url_hash
+from app.core.cache import async_cache
+from app.core.database import AsyncReadSessionLocal, AsyncSessionLocal
+from app.models.click_rollup import ClickRollupArchive
+from app.models.link import Link
+from app.models.link_archive import LinkArchive
+from app.schemas.link import LinkCreate, LinkUpdate
+from app.services.link_service import (
+    CACHE_NS_LINK,
+    CACHE_NS_SEARCH,
+    CACHE_NS_STATS,
+    track_click_async,
+)
+from app.services.bulk_links import (
+    BulkItem,
+    build_rows,
+    collect_results,
+    created_codes,
+    error_result,
+    insert_ignoring_conflicts,
+    split_items,
+)
+from app.services.click_analytics import timeseries_points, timeseries_query, timeseries_range
+from app.services.click_counter import click_counter
+from app.services.link_archive import latest_archived_query
+from app.services.link_queries import (
+    is_expired,
+    not_expired_clause,
+    search_body,
+    search_cache_key,
+    search_ttl,
+)
+from app.services.link_view import LinkView
+from app.services.short_codes import code_generator, is_unique_violation
+
+
+async def _invalidate_link_cache(short_code: str) -> None:
+    await async_cache.invalidate(
+        {CACHE_NS_LINK: [short_code], CACHE_NS_STATS: [short_code]},
+        bump=(CACHE_NS_SEARCH,),
+    )
+
+
+async def _refresh_link_cache(short_code: str, payload: Optional[dict]) -> None:
+    await _invalidate_link_cache(short_code)
+    for namespace in (CACHE_NS_LINK, CACHE_NS_STATS):
+        if payload is not None:
+            await async_cache.ns_set(namespace, short_code, payload)
+        elif settings.negative_cache_ttl_seconds:
+            await async_cache.ns_set_missing(namespace, short_code, settings.negative_cache_ttl_seconds)
+
+
+async def _invalidate_created(results) -> None:
+    codes = created_codes(results)
+    await async_cache.invalidate({CACHE_NS_LINK: codes, CACHE_NS_STATS: codes}, bump=(CACHE_NS_SEARCH,))
+
+
+async def _merge_pending_clicks(view: LinkView) -> LinkView:
+    return view.with_pending_clicks(*await click_counter.pending_async(view.short_code))
+
+
+async def _view_payload(db: AsyncSession, read_db: AsyncSession, short_code: str) -> Optional[dict]:
+    link = (await read_db.execute(select(Link).where(Link.short_code == short_code))).scalars().first()
+    if link is None and read_db is not db:
+        # The replica may not have caught up with a link created moments ago;
+        # confirm on the primary before caching a tombstone.
+        link = (await db.execute(select(Link).where(Link.short_code == short_code))).scalars().first()
+    if not link or is_expired(link):
+        return None
+    return LinkView.from_link(link).to_payload()
+
+
+async def _load_view_payload_detached(short_code: str) -> Optional[dict]:
+    # Runs as the shared single-flight task, which outlives a cancelled
+    # leader request, so it must not borrow that request's session.
+    async with AsyncSessionLocal() as db:
+        if AsyncReadSessionLocal is None:
+            return await _view_payload(db, db, short_code)
+        async with AsyncReadSessionLocal() as read_db:
+            return await _view_payload(db, read_db, short_code)
+
+
+class AsyncLinkService:
+    def __init__(self, db: AsyncSession, base_url: str = '', read_db: Optional[AsyncSession] = None):
+        self.db = db
+        self.read_db = read_db or db
+        self.base_url = base_url.rstrip('/')
+
+    async def _get_link(self, short_code: str, db: Optional[AsyncSession] = None) -> Optional[Link]:
+        result = await (db or self.db).execute(select(Link).where(Link.short_code == short_code))
+        return result.scalars().first()
+
+    async def create(self, data: LinkCreate, owner_id: Optional[int] = None) -> Link:
+        alias = data.custom_alias.strip().lower() if data.custom_alias else None
+        for _ in range(settings.short_code_max_attempts):
+            link = Link(
+                short_code=alias or await code_generator.next_code_async(self.db),
+                original_url=data.original_url,
+                expires_at=data.expires_at,
+                owner_id=owner_id,
+            )
+            self.db.add(link)
+            try:
+                await self.db.commit()
+            except IntegrityError as e:
+                await self.db.rollback()
+                if not is_unique_violation(e):
+                    raise
+                if alias:
+                    raise ValueError('Alias already taken')
+                continue
+            await _invalidate_link_cache(link.short_code)
+            return link
+        raise RuntimeError('Could not allocate a unique short code')
+
+    async def create_many(self, batch: list[BulkItem], owner_id: Optional[int] = None) -> list[dict]:
+        results, pending = split_items(batch)
+        stmt = insert_ignoring_conflicts(self.db.get_bind().dialect.name)
+        for _ in range(settings.short_code_max_attempts):
+            if not pending:
+                break
+            codes = await code_generator.next_codes_async(
+                self.db, sum(1 for _, _, alias in pending if not alias)
+            )
+            rows = build_rows(pending, codes, owner_id)
+            inserted = set((await self.db.execute(stmt, rows)).scalars())
+            pending = collect_results(pending, rows, inserted, results, self.base_url)
+        await self.db.commit()
+        for index, _, _ in pending:
+            results[index] = error_result(index, 'Could not allocate a unique short code')
+        await _invalidate_created(results.values())
+        return [results[index] for index, _ in batch]
+
+    async def _load_view_payload(self, short_code: str) -> Optional[dict]:
+        return await _view_payload(self.db, self.read_db, short_code)
+
+    async def _get_view(self, namespace: str, short_code: str, use_cache: bool) -> Optional[LinkView]:
+        if use_cache:
+            payload = await async_cache.ns_get_or_load(
+                namespace,
+                short_code,
+                lambda: _load_view_payload_detached(short_code),
+                negative_ttl=settings.negative_cache_ttl_seconds,
+            )
+            if not payload:
+                return None
+            view = LinkView.from_payload(payload)
+            if view is not None:
+                return None if view.is_expired else view
+            # Cached in an older, slimmer format: reload and overwrite it.
+        payload = await self._load_view_payload(short_code)
+        if payload is not None:
+            await async_cache.ns_set(namespace, short_code, payload)
+        return LinkView.from_payload(payload)
+
+    async def get_by_short_code(self, short_code: str, use_cache: bool = True) -> Optional[LinkView]:
+        return await self._get_view(CACHE_NS_LINK, short_code.lower(), use_cache)
+
+    async def resolve_cached(self, short_code: str) -> Optional[str]:
+        view = await self.get_by_short_code(short_code)
+        return view.original_url if view else None
+
+    async def resolve_and_track(
+        self, short_code: str, referrer: Optional[str] = None, country: Optional[str] = None
+    ) -> Optional[str]:
+        link = await self.get_by_short_code(short_code, use_cache=False)
+        if not link:
+            return None
+        await track_click_async(link.short_code, referrer, country)
+        return link.original_url
+
+    async def delete(self, short_code: str, owner_id: Optional[int] = None) -> bool:
+        short_code = short_code.lower()
+        link = await self._get_link(short_code)
+        if not link:
+            return False
+        if owner_id is not None and link.owner_id != owner_id:
+            return False
+        await self.db.delete(link)
+        await self.db.commit()
+        await _refresh_link_cache(short_code, None)
+        return True
+
+    async def update(
+        self, short_code: str, data: LinkUpdate, owner_id: Optional[int] = None
+    ) -> Optional[Link]:
+        short_code = short_code.lower()
+        link = await self._get_link(short_code)
+        if not link:
+            return None
+        if owner_id is not None and link.owner_id != owner_id:
+            return None
+        if is_expired(link):
+            return None
+        link.original_url = data.original_url
+        await self.db.commit()
+        await self.db.refresh(link)
+        await _refresh_link_cache(short_code, LinkView.from_link(link).to_payload())
+        return link
+
+    async def get_stats(self, short_code: str, use_cache: bool = True) -> Optional[LinkView]:
+        view = await self._get_view(CACHE_NS_STATS, short_code.lower(), use_cache)
+        return await _merge_pending_clicks(view) if view else None
+
+    async def get_timeseries(
+        self,
+        short_code: str,
+        granularity: str = 'hour',
+        start: Optional[datetime] = None,
+        end: Optional[datetime] = None,
+        group_by: Optional[str] = None,
+    ) -> Optional[dict]:
+        start, end = timeseries_range(granularity, start, end)
+        link_id = (
+            await self.read_db.execute(
+                select(Link.id).where(Link.short_code == short_code.lower(), not_expired_clause())
+            )
+        ).scalar()
+        if link_id is None:
+            return None
+        rows = (
+            await self.read_db.execute(timeseries_query(link_id, granularity, start, end, group_by))
+        ).all()
+        return {
+            'short_code': short_code.lower(),
+            'granularity': granularity,
+            'start': start,
+            'end': end,
+            'points': timeseries_points(rows, group_by),
+        }
+
+    async def search_by_original_url_json(self, original_url: str, use_cache: bool = True) -> str:
+        url_normalized = normalize_url(original_url)
+        key = search_cache_key(url_normalized)
+        if use_cache:
+            body = await async_cache.ns_get_raw(CACHE_NS_SEARCH, key)
+            if body is not None:
+                return body
+
+        result = await self.read_db.execute(
+            select(Link).where(
+                Link.url_hash == url_hash(url_normalized),
+                Link.normalized_url == url_normalized,
+            )
+        )
+        valid = [l for l in result.scalars().all() if not is_expired(l)]
+        body = search_body(valid)
+        await async_cache.ns_set_raw(CACHE_NS_SEARCH, key, body, search_ttl(valid))
+        return body
+
+    async def search_by_domain(self, domain: str, limit: int = 100) -> list[Link]:
+        result = await self.read_db.execute(
+            select(Link)
+            .where(Link.domain == url_domain(normalize_url(domain)), not_expired_clause())
+            .order_by(Link.id.desc())
+            .limit(limit)
+        )
+        return list(result.scalars().all())
+
+    async def get_archived(self, short_code: str) -> Optional[LinkArchive]:
+        return (await self.read_db.execute(latest_archived_query(short_code.lower()))).scalar()
+
+    async def get_archived_timeseries(
+        self,
+        short_code: str,
+        granularity: str = 'hour',
+        start: Optional[datetime] = None,
+        end: Optional[datetime] = None,
+        group_by: Optional[str] = None,
+    ) -> Optional[dict]:
+        archived = await self.get_archived(short_code)
+        if archived is None:
+            return None
+        start, end = timeseries_range(granularity, start, end, archived.archived_at)
+        rows = (
+            await self.read_db.execute(
+                timeseries_query(archived.id, granularity, start, end, group_by, ClickRollupArchive)
+            )
+        ).all()
+        return {
+            'short_code': archived.short_code,
+            'granularity': granularity,
+            'start': start,
+            'end': end,
+            'points': timeseries_points(rows, group_by),
+        }
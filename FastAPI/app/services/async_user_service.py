@@ -0,0 +1,32 @@
+from typing import Optional
+
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.core.security import invalidate_principal_async, password_hasher
+from app.models.user import User
+from app.schemas.user import UserCreate
+
+
+class AsyncUserService:
+    def __init__(self, db: AsyncSession):
+        self.db = db
+
+    async def get_by_email(self, email: str) -> Optional[User]:
+        result = await self.db.execute(select(User).where(User.email == email.lower()))
+        return result.scalars().first()
+
+    async def get_by_id(self, user_id: int) -> Optional[User]:
+        result = await self.db.execute(select(User).where(User.id == user_id))
+        return result.scalars().first()
+
+    async def create(self, data: UserCreate) -> User:
+        user = User(
+            email=data.email.lower(),
+            hashed_password=await password_hasher.hash_async(data.password),
+        )
+        self.db.add(user)
+        await self.db.commit()
+        await self.db.refresh(user)
+        await invalidate_principal_async(user.id)
+        return user
@@ -0,0 +1,209 @@
+from datetime import datetime
+from tempfile import SpooledTemporaryFile
+from typing import AsyncIterable, AsyncIterator, Awaitable, Callable, Iterator, Optional, Union
+
+import orjson
+from pydantic import ValidationError
+from sqlalchemy.dialects import postgresql, sqlite
+
+from app.core.serialization import dumps_response
+from app.core.urls import url_fields
+from app.models.link import Link
+from app.schemas.link import LinkCreate
+
+BulkItem = tuple[int, Union[LinkCreate, str]]
+
+# Results beyond this size are spooled to a temporary file.
+_SPOOL_MEMORY_BYTES = 1 << 20
+_SPOOL_CHUNK_BYTES = 64 * 1024
+
+
+class BulkTooLarge(ValueError):
+    pass
+
+
+def _parse_item(raw) -> Union[LinkCreate, str]:
+    try:
+        return LinkCreate.model_validate(raw)
+    except ValidationError as e:
+        return '; '.join(err['msg'] for err in e.errors())
+
+
+def _parse_line(line: bytes) -> Union[LinkCreate, str]:
+    try:
+        return _parse_item(orjson.loads(line))
+    except orjson.JSONDecodeError:
+        return 'Invalid JSON'
+
+
+async def _iter_lines(chunks: AsyncIterable[bytes], max_bytes: int) -> AsyncIterator[bytes]:
+    received = 0
+    tail = b''
+    async for chunk in chunks:
+        received += len(chunk)
+        if received > max_bytes:
+            raise BulkTooLarge(f'Body exceeds {max_bytes} bytes')
+        *lines, tail = (tail + chunk).split(b'\n')
+        for line in lines:
+            yield line
+    if tail:
+        yield tail
+
+
+async def _iter_ndjson(chunks: AsyncIterable[bytes], max_items: int, max_bytes: int) -> AsyncIterator[BulkItem]:
+    # Parsed as the body arrives. Past a limit the items already read are
+    # kept and the rest of the upload is reported as one error.
+    index = 0
+    try:
+        async for line in _iter_lines(chunks, max_bytes):
+            if not line.strip():
+                continue
+            if index >= max_items:
+                raise BulkTooLarge(f'Upload exceeds {max_items} items')
+            yield index, _parse_line(line)
+            index += 1
+    except BulkTooLarge as e:
+        yield index, f'{e}; the rest of the upload was not processed'
+
+
+async def _read_body(chunks: AsyncIterable[bytes], max_bytes: int) -> bytes:
+    body = bytearray()
+    async for chunk in chunks:
+        body += chunk
+        if len(body) > max_bytes:
+            raise BulkTooLarge(f'Body exceeds {max_bytes} bytes')
+    return bytes(body)
+
+
+async def iter_bulk_items(
+    chunks: AsyncIterable[bytes], ndjson: bool, max_items: int, max_bytes: int
+) -> AsyncIterable[BulkItem]:
+    # Raises BulkTooLarge or ValueError before yielding anything for a JSON
+    # array, which has to be read whole; NDJSON is never buffered.
+    if ndjson:
+        return _iter_ndjson(chunks, max_items, max_bytes)
+    try:
+        items = orjson.loads(await _read_body(chunks, max_bytes))
+    except orjson.JSONDecodeError:
+        items = None
+    if not isinstance(items, list):
+        raise ValueError('Body must be a JSON array or NDJSON')
+    if len(items) > max_items:
+        raise BulkTooLarge(f'Upload exceeds {max_items} items')
+    return _iter_list(items)
+
+
+async def _iter_list(items: list) -> AsyncIterator[BulkItem]:
+    for index, raw in enumerate(items):
+        yield index, _parse_item(raw)
+
+
+async def iter_batches(items: AsyncIterable[BulkItem], size: int) -> AsyncIterator[list[BulkItem]]:
+    batch = []
+    async for item in items:
+        batch.append(item)
+        if len(batch) >= size:
+            yield batch
+            batch = []
+    if batch:
+        yield batch
+
+
+async def spool_results(
+    items: AsyncIterable[BulkItem], size: int, create: Callable[[list[BulkItem]], Awaitable[list[dict]]]
+) -> SpooledTemporaryFile:
+    # The whole upload is processed before the response starts: Starlette
+    # reads from the connection while streaming a response, so the request
+    # body cannot be consumed at the same time.
+    spool = SpooledTemporaryFile(max_size=_SPOOL_MEMORY_BYTES)
+    try:
+        async for batch in iter_batches(items, size):
+            spool.write(b''.join(dumps_response(result) + b'\n' for result in await create(batch)))
+    except BaseException:
+        spool.close()
+        raise
+    spool.seek(0)
+    return spool
+
+
+def iter_spool(spool: SpooledTemporaryFile) -> Iterator[bytes]:
+    while chunk := spool.read(_SPOOL_CHUNK_BYTES):
+        yield chunk
+
+
+def insert_ignoring_conflicts(dialect_name: str):
+    dialect = postgresql if dialect_name == 'postgresql' else sqlite
+    return (
+        dialect.insert(Link)
+        .on_conflict_do_nothing(index_elements=[Link.short_code])
+        .returning(Link.short_code)
+    )
+
+
+def error_result(index: int, error: str) -> dict:
+    return {'index': index, 'error': error}
+
+
+def link_result(index: int, row: dict, base_url: str) -> dict:
+    return {
+        'index': index,
+        'short_code': row['short_code'],
+        'original_url': row['original_url'],
+        'short_url': f"{base_url}/api/v1/links/{row['short_code']}",
+        'created_at': row['created_at'],
+        'expires_at': row['expires_at'],
+    }
+
+
+def created_codes(results) -> list[str]:
+    return [r['short_code'] for r in results if 'short_code' in r]
+
+
+def split_items(batch: list[BulkItem]) -> tuple[dict[int, dict], list[tuple[int, LinkCreate, Optional[str]]]]:
+    results: dict[int, dict] = {}
+    pending = []
+    aliases = set()
+    for index, item in batch:
+        if isinstance(item, str):
+            results[index] = error_result(index, item)
+            continue
+        alias = item.custom_alias.strip().lower() if item.custom_alias else None
+        if alias in aliases:
+            results[index] = error_result(index, 'Alias already taken')
+            continue
+        if alias:
+            aliases.add(alias)
+        pending.append((index, item, alias))
+    return results, pending
+
+
+def build_rows(pending: list, codes: list[str], owner_id: Optional[int]) -> list[dict]:
+    codes = iter(codes)
+    # Set here rather than by the column default so results can echo it.
+    created_at = datetime.utcnow()
+    return [
+        {
+            'short_code': alias or next(codes),
+            'created_at': created_at,
+            'original_url': item.original_url,
+            'expires_at': item.expires_at,
+            'owner_id': owner_id,
+            **url_fields(item.original_url),
+        }
+        for _, item, alias in pending
+    ]
+
+
+def collect_results(
+    pending: list, rows: list[dict], inserted: set[str], results: dict[int, dict], base_url: str
+) -> list:
+    retry = []
+    for (index, item, alias), row in zip(pending, rows):
+        if row['short_code'] in inserted:
+            inserted.discard(row['short_code'])
+            results[index] = link_result(index, row, base_url)
+        elif alias:
+            results[index] = error_result(index, 'Alias already taken')
+        else:
+            retry.append((index, item, alias))
+    return retry
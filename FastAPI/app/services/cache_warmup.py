@@ -0,0 +1,122 @@
+import json
+import threading
+from dataclasses import dataclass, field
+from datetime import datetime
+from typing import Optional
+
+import redis
+from sqlalchemy import func, or_, select
+from sqlalchemy.orm import Session
+
+from app.config import settings
+from app.core.cache import cache, get_redis
+from app.models.link import Link
+from app.services.link_service import CACHE_NS_LINK, CACHE_NS_STATS
+from app.services.link_view import LinkView
+
+# The warm-up usually runs in another worker or in the CLI, so progress is
+# shared through Redis for /health in every process.
+WARMUP_PROGRESS_KEY = 'cache:warmup:progress'
+
+_VIEW_COLUMNS = (
+    Link.short_code,
+    Link.original_url,
+    Link.created_at,
+    Link.click_count,
+    Link.last_clicked_at,
+    Link.expires_at,
+)
+
+
+@dataclass
+class WarmupProgress:
+    running: bool = False
+    started_at: Optional[datetime] = None
+    finished_at: Optional[datetime] = None
+    target: int = 0
+    scanned: int = 0
+    warmed: int = 0
+    last_error: Optional[str] = None
+    _lock: threading.Lock = field(default_factory=threading.Lock, repr=False)
+
+    def start(self, target: int) -> None:
+        with self._lock:
+            self.running = True
+            self.started_at = datetime.utcnow()
+            self.finished_at = None
+            self.target = target
+            self.scanned = 0
+            self.warmed = 0
+            self.last_error = None
+        self._publish()
+
+    def advance(self, scanned: int, warmed: int) -> None:
+        with self._lock:
+            self.scanned += scanned
+            self.warmed += warmed
+        self._publish()
+
+    def finish(self, error: Optional[str] = None) -> None:
+        with self._lock:
+            self.running = False
+            self.finished_at = datetime.utcnow()
+            self.last_error = error
+        self._publish()
+
+    def as_dict(self) -> dict:
+        with self._lock:
+            return {
+                'running': self.running,
+                'started_at': self.started_at.isoformat() if self.started_at else None,
+                'finished_at': self.finished_at.isoformat() if self.finished_at else None,
+                'target': self.target,
+                'scanned': self.scanned,
+                'warmed': self.warmed,
+                'last_error': self.last_error,
+            }
+
+    def _publish(self) -> None:
+        try:
+            get_redis().set(WARMUP_PROGRESS_KEY, json.dumps(self.as_dict()))
+        except redis.RedisError:
+            pass
+
+    def current(self) -> dict:
+        try:
+            raw = get_redis().get(WARMUP_PROGRESS_KEY)
+        except redis.RedisError:
+            raw = None
+        return json.loads(raw) if raw else self.as_dict()
+
+
+warmup_progress = WarmupProgress()
+
+
+def warm_cache(db: Session, limit: Optional[int] = None, batch_size: Optional[int] = None) -> int:
+    # Streams the most clicked live links and fills the link and stats
+    # namespaces one pipelined script call per batch. Keys already in Redis
+    # are left as they are, so a warm-up never overwrites a fresher value.
+    limit = settings.cache_warmup_limit if limit is None else limit
+    batch_size = batch_size or settings.cache_warmup_batch_size
+    stmt = (
+        select(*_VIEW_COLUMNS)
+        .where(or_(Link.expires_at.is_(None), Link.expires_at > datetime.utcnow()))
+        .order_by(func.coalesce(Link.click_count, 0).desc(), Link.last_clicked_at.desc().nulls_last())
+        .limit(limit)
+        .execution_options(yield_per=batch_size)
+    )
+
+    warmed = 0
+    warmup_progress.start(limit)
+    try:
+        for rows in db.execute(stmt).partitions():
+            payloads = {row.short_code: LinkView.from_link(row).to_payload() for row in rows}
+            added = cache.ns_add_many(CACHE_NS_LINK, payloads)
+            cache.ns_add_many(CACHE_NS_STATS, payloads)
+            warmed += added
+            warmup_progress.advance(len(rows), added)
+    except Exception as e:
+        warmup_progress.finish(error=str(e))
+        raise
+    warmup_progress.finish()
+    return warmed
@@ -0,0 +1,83 @@
+import json
+import threading
+from dataclasses import dataclass, field
+from datetime import datetime
+from typing import Optional
+
+import redis
+
+from app.core.cache import get_redis
+
+# Cleanup runs as a job on whichever worker claims it; progress is shared
+# through Redis so /health on every worker reports it.
+CLEANUP_PROGRESS_KEY = 'cleanup:progress'
+
+
+@dataclass
+class CleanupProgress:
+    running: bool = False
+    started_at: Optional[datetime] = None
+    finished_at: Optional[datetime] = None
+    batches: int = 0
+    rows_deleted: int = 0
+    total_rows_deleted: int = 0
+    last_error: Optional[str] = None
+    _lock: threading.Lock = field(default_factory=threading.Lock, repr=False)
+
+    def start(self) -> None:
+        # The running total spans workers, so continue from the published one.
+        published = self._published() or {}
+        with self._lock:
+            self.total_rows_deleted = max(self.total_rows_deleted, published.get('total_rows_deleted') or 0)
+            self.running = True
+            self.started_at = datetime.utcnow()
+            self.finished_at = None
+            self.batches = 0
+            self.rows_deleted = 0
+            self.last_error = None
+        self._publish()
+
+    def advance(self, rows: int) -> None:
+        with self._lock:
+            self.batches += 1
+            self.rows_deleted += rows
+            self.total_rows_deleted += rows
+        self._publish()
+
+    def finish(self, error: Optional[str] = None) -> None:
+        with self._lock:
+            self.running = False
+            self.finished_at = datetime.utcnow()
+            self.last_error = error
+        self._publish()
+
+    def as_dict(self) -> dict:
+        with self._lock:
+            return {
+                'running': self.running,
+                'started_at': self.started_at.isoformat() if self.started_at else None,
+                'finished_at': self.finished_at.isoformat() if self.finished_at else None,
+                'batches': self.batches,
+                'rows_deleted': self.rows_deleted,
+                'total_rows_deleted': self.total_rows_deleted,
+                'last_error': self.last_error,
+            }
+
+    def _publish(self) -> None:
+        try:
+            get_redis().set(CLEANUP_PROGRESS_KEY, json.dumps(self.as_dict()))
+        except redis.RedisError:
+            pass
+
+    def _published(self) -> Optional[dict]:
+        try:
+            raw = get_redis().get(CLEANUP_PROGRESS_KEY)
+        except redis.RedisError:
+            return None
+        return json.loads(raw) if raw else None
+
+    def current(self) -> dict:
+        return self._published() or self.as_dict()
+
+
+cleanup_progress = CleanupProgress()
@@ -0,0 +1,264 @@
+import threading
+import uuid
+from collections import Counter
+from datetime import datetime, timedelta
+from typing import Optional
+from urllib.parse import urlsplit
+
+import redis
+from sqlalchemy import func, select
+from sqlalchemy.dialects import postgresql, sqlite
+from sqlalchemy.orm import Session
+
+from app.config import settings
+from app.core.cache import RELEASE_LOCK_SCRIPT, get_async_redis, get_redis
+from app.models.click_rollup import ClickRollup
+from app.models.link import Link
+from app.services.click_flushes import mark_flush_applied, new_flush_id
+
+PENDING_EVENTS_KEY = 'clicks:rollup:pending'
+FLUSHING_EVENTS_KEY = 'clicks:rollup:flushing'
+FLUSHING_ID_KEY = 'clicks:rollup:flushing:id'
+FLUSH_LOCK_KEY = 'clicks:rollup:lock'
+
+GRANULARITIES = {'hour': timedelta(hours=1), 'day': timedelta(days=1)}
+GROUP_BY = ('referrer', 'country')
+_FIELD_SEP = '\t'
+
+# Same snapshot-and-id scheme as the click counter flush.
+_TAKE_SNAPSHOT_SCRIPT = """
+if redis.call('EXISTS', KEYS[2]) == 0 and redis.call('EXISTS', KEYS[1]) == 1 then
+    redis.call('RENAME', KEYS[1], KEYS[2])
+    redis.call('SET', KEYS[3], ARGV[1])
+end
+if redis.call('EXISTS', KEYS[2]) == 1 then
+    redis.call('SET', KEYS[3], ARGV[1], 'NX')
+end
+return {redis.call('HGETALL', KEYS[2]), redis.call('GET', KEYS[3]) or ''}
+"""
+
+EventKey = tuple[str, datetime, str, str]
+
+
+def bucket_start(moment: datetime, granularity: str) -> datetime:
+    moment = moment.replace(minute=0, second=0, microsecond=0)
+    if granularity == 'day':
+        moment = moment.replace(hour=0)
+    return moment
+
+
+def referrer_host(referrer: Optional[str]) -> str:
+    if not referrer:
+        return ''
+    try:
+        host = urlsplit(referrer).hostname or ''
+    except ValueError:
+        return ''
+    return host[:255]
+
+
+def country_code(country: Optional[str]) -> str:
+    country = (country or '').strip().upper()
+    return country if len(country) == 2 and country.isalpha() else ''
+
+
+def _event_field(short_code: str, referrer: Optional[str], country: Optional[str]) -> str:
+    hour = bucket_start(datetime.utcnow(), 'hour')
+    return _FIELD_SEP.join((short_code, hour.isoformat(), referrer_host(referrer), country_code(country)))
+
+
+def _parse_event_field(field: str) -> Optional[EventKey]:
+    parts = field.split(_FIELD_SEP)
+    if len(parts) != 4:
+        return None
+    short_code, hour, referrer, country = parts
+    return short_code, datetime.fromisoformat(hour), referrer, country
+
+
+def _pairs(flat: list) -> dict:
+    return dict(zip(flat[::2], flat[1::2]))
+
+
+def _upsert_statement(dialect_name: str):
+    dialect = postgresql if dialect_name == 'postgresql' else sqlite
+    stmt = dialect.insert(ClickRollup)
+    return stmt.on_conflict_do_update(
+        index_elements=['link_id', 'granularity', 'bucket', 'referrer', 'country'],
+        set_={'count': ClickRollup.count + stmt.excluded.count},
+    )
+
+
+def timeseries_range(
+    granularity: str,
+    start: Optional[datetime],
+    end: Optional[datetime],
+    until: Optional[datetime] = None,
+) -> tuple[datetime, datetime]:
+    # Without an explicit end the range closes with the bucket holding
+    # `until` (now by default).
+    if granularity not in GRANULARITIES:
+        raise ValueError(f'Unknown granularity: {granularity}')
+    step = GRANULARITIES[granularity]
+    if end:
+        end = bucket_start(end, granularity)
+    else:
+        end = bucket_start(until or datetime.utcnow(), granularity) + step
+    start = bucket_start(start, granularity) if start else end - step * settings.timeseries_default_buckets
+    if start >= end:
+        raise ValueError('start must be before end')
+    if (end - start) / step > settings.timeseries_max_buckets:
+        raise ValueError(f'Range exceeds {settings.timeseries_max_buckets} buckets')
+    return start, end
+
+
+def timeseries_query(
+    link_id: int,
+    granularity: str,
+    start: datetime,
+    end: datetime,
+    group_by: Optional[str],
+    model: type = ClickRollup,
+):
+    # model is ClickRollupArchive for links moved out by the cleanup job.
+    if group_by is not None and group_by not in GROUP_BY:
+        raise ValueError(f'Cannot group by {group_by}')
+    dimensions = [model.bucket]
+    if group_by:
+        dimensions.append(getattr(model, group_by))
+    return (
+        select(*dimensions, func.sum(model.count).label('count'))
+        .where(
+            model.link_id == link_id,
+            model.granularity == granularity,
+            model.bucket >= start,
+            model.bucket < end,
+        )
+        .group_by(*dimensions)
+        .order_by(*dimensions)
+    )
+
+
+def timeseries_points(rows, group_by: Optional[str]) -> list[dict]:
+    points = []
+    for row in rows:
+        point = {'bucket': row.bucket, 'count': int(row.count)}
+        if group_by:
+            point[group_by] = getattr(row, group_by)
+        points.append(point)
+    return points
+
+
+class ClickAnalytics:
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._local_events: Counter = Counter()
+
+    def record(self, short_code: str, referrer: Optional[str] = None, country: Optional[str] = None) -> None:
+        field = _event_field(short_code, referrer, country)
+        try:
+            get_redis().hincrby(PENDING_EVENTS_KEY, field, 1)
+        except redis.RedisError:
+            self._record_local(field)
+
+    async def record_async(
+        self, short_code: str, referrer: Optional[str] = None, country: Optional[str] = None
+    ) -> None:
+        field = _event_field(short_code, referrer, country)
+        try:
+            await get_async_redis().hincrby(PENDING_EVENTS_KEY, field, 1)
+        except redis.RedisError:
+            self._record_local(field)
+
+    def _record_local(self, field: str) -> None:
+        with self._lock:
+            self._local_events[field] += 1
+
+    def flush(self, db: Session) -> int:
+        return self._flush_redis(db) + self.flush_local(db)
+
+    def _flush_redis(self, db: Session) -> int:
+        token = uuid.uuid4().hex
+        try:
+            r = get_redis()
+            if not r.set(FLUSH_LOCK_KEY, token, nx=True, ex=settings.click_flush_lock_seconds):
+                return 0
+        except redis.RedisError:
+            return 0
+        try:
+            events, flush_id = r.eval(
+                _TAKE_SNAPSHOT_SCRIPT, 3, PENDING_EVENTS_KEY, FLUSHING_EVENTS_KEY, FLUSHING_ID_KEY, new_flush_id()
+            )
+            events = _pairs(events)
+            if not events:
+                return 0
+            flushed = self._apply(db, Counter({field: int(n) for field, n in events.items()}), flush_id)
+            r.delete(FLUSHING_EVENTS_KEY, FLUSHING_ID_KEY)
+            return flushed
+        except redis.RedisError:
+            return 0
+        finally:
+            try:
+                r.eval(RELEASE_LOCK_SCRIPT, 1, FLUSH_LOCK_KEY, token)
+            except redis.RedisError:
+                pass
+
+    def flush_local(self, db: Session) -> int:
+        with self._lock:
+            events, self._local_events = self._local_events, Counter()
+        if not events:
+            return 0
+        try:
+            return self._apply(db, events)
+        except Exception:
+            with self._lock:
+                self._local_events.update(events)
+            raise
+
+    def _apply(self, db: Session, events: Counter, flush_id: Optional[str] = None) -> int:
+        parsed: Counter = Counter()
+        for field, n in events.items():
+            key = _parse_event_field(field)
+            if key:
+                parsed[key] += n
+        codes = list({short_code for short_code, _, _, _ in parsed})
+        size = settings.click_flush_batch_size
+        try:
+            if flush_id and not mark_flush_applied(db, flush_id):
+                db.rollback()
+                return 0
+            link_ids = {}
+            for start in range(0, len(codes), size):
+                link_ids.update(
+                    db.execute(
+                        select(Link.short_code, Link.id).where(Link.short_code.in_(codes[start:start + size]))
+                    ).all()
+                )
+            rollups: Counter = Counter()
+            for (short_code, hour, referrer, country), n in parsed.items():
+                link_id = link_ids.get(short_code)
+                if link_id is None:
+                    continue
+                for granularity in GRANULARITIES:
+                    rollups[(link_id, granularity, bucket_start(hour, granularity), referrer, country)] += n
+            rows = [
+                {
+                    'link_id': link_id,
+                    'granularity': granularity,
+                    'bucket': bucket,
+                    'referrer': referrer,
+                    'country': country,
+                    'count': n,
+                }
+                for (link_id, granularity, bucket, referrer, country), n in sorted(rollups.items())
+            ]
+            stmt = _upsert_statement(db.get_bind().dialect.name)
+            for start in range(0, len(rows), size):
+                db.execute(stmt, rows[start:start + size])
+            db.commit()
+        except Exception:
+            db.rollback()
+            raise
+        return len(rows)
+
+
+click_analytics = ClickAnalytics()
@@ -0,0 +1,222 @@
+import threading
+import uuid
+from collections import Counter
+from datetime import datetime
+from typing import Optional
+
+import redis
+from sqlalchemy import DateTime, Integer, bindparam, case, func, text, update
+from sqlalchemy.orm import Session
+
+from app.config import settings
+from app.core.cache import RELEASE_LOCK_SCRIPT, get_async_redis, get_redis
+from app.models.link import Link
+from app.services.click_flushes import mark_flush_applied, new_flush_id
+
+PENDING_COUNTS_KEY = 'clicks:pending:counts'
+PENDING_LAST_KEY = 'clicks:pending:last'
+FLUSHING_COUNTS_KEY = 'clicks:flushing:counts'
+FLUSHING_LAST_KEY = 'clicks:flushing:last'
+FLUSHING_ID_KEY = 'clicks:flushing:id'
+FLUSH_LOCK_KEY = 'clicks:flush:lock'
+_PENDING_KEYS = (PENDING_COUNTS_KEY, FLUSHING_COUNTS_KEY, PENDING_LAST_KEY, FLUSHING_LAST_KEY)
+
+# Moves the pending hashes aside unless a previous flush left its snapshot
+# behind, in which case that snapshot is retried first. Each snapshot keeps
+# one id, recorded in the database together with its counts, so a snapshot
+# whose cleanup failed after the commit is never applied twice.
+_TAKE_SNAPSHOT_SCRIPT = """
+if redis.call('EXISTS', KEYS[3]) == 0 and redis.call('EXISTS', KEYS[1]) == 1 then
+    redis.call('RENAME', KEYS[1], KEYS[3])
+    if redis.call('EXISTS', KEYS[2]) == 1 then
+        redis.call('RENAME', KEYS[2], KEYS[4])
+    end
+    redis.call('SET', KEYS[5], ARGV[1])
+end
+if redis.call('EXISTS', KEYS[3]) == 1 then
+    redis.call('SET', KEYS[5], ARGV[1], 'NX')
+end
+return {redis.call('HGETALL', KEYS[3]), redis.call('HGETALL', KEYS[4]), redis.call('GET', KEYS[5]) or ''}
+"""
+
+_FLUSH_SQL = (
+    'UPDATE links SET '
+    'click_count = COALESCE(links.click_count, 0) + v.clicks, '
+    'last_clicked_at = GREATEST(COALESCE(links.last_clicked_at, v.clicked_at), v.clicked_at) '
+    'FROM (VALUES {values}) AS v(short_code, clicks, clicked_at) '
+    'WHERE links.short_code = v.short_code'
+)
+
+# Portable per-row form (executemany) for databases without UPDATE ... FROM
+# (VALUES ...) and GREATEST, i.e. SQLite in development and benchmarks.
+_links = Link.__table__
+_clicked_at = bindparam('clicked_at', type_=DateTime())
+_FLUSH_ROWS_STMT = (
+    update(_links)
+    .where(_links.c.short_code == bindparam('code'))
+    .values(
+        click_count=func.coalesce(_links.c.click_count, 0) + bindparam('clicks', type_=Integer()),
+        last_clicked_at=case(
+            (_links.c.last_clicked_at.is_(None), _clicked_at),
+            (_links.c.last_clicked_at < _clicked_at, _clicked_at),
+            else_=_links.c.last_clicked_at,
+        ),
+    )
+)
+
+
+def _pairs(flat: list) -> dict:
+    return dict(zip(flat[::2], flat[1::2]))
+
+
+class ClickCounter:
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._local_counts: Counter = Counter()
+        self._local_last: dict[str, datetime] = {}
+
+    def record(self, short_code: str) -> None:
+        now = datetime.utcnow()
+        try:
+            pipe = get_redis().pipeline(transaction=False)
+            pipe.hincrby(PENDING_COUNTS_KEY, short_code, 1)
+            pipe.hset(PENDING_LAST_KEY, short_code, now.isoformat())
+            pipe.execute()
+        except redis.RedisError:
+            self._record_local(short_code, now)
+
+    async def record_async(self, short_code: str) -> None:
+        now = datetime.utcnow()
+        try:
+            async with get_async_redis().pipeline(transaction=False) as pipe:
+                pipe.hincrby(PENDING_COUNTS_KEY, short_code, 1)
+                pipe.hset(PENDING_LAST_KEY, short_code, now.isoformat())
+                await pipe.execute()
+        except redis.RedisError:
+            self._record_local(short_code, now)
+
+    def _record_local(self, short_code: str, now: datetime) -> None:
+        with self._lock:
+            self._local_counts[short_code] += 1
+            self._local_last[short_code] = now
+
+    def pending(self, short_code: str) -> tuple[int, Optional[datetime]]:
+        try:
+            pipe = get_redis().pipeline(transaction=False)
+            for key in _PENDING_KEYS:
+                pipe.hget(key, short_code)
+            values = pipe.execute()
+        except redis.RedisError:
+            values = [None] * len(_PENDING_KEYS)
+        return self._merge_pending(short_code, values)
+
+    async def pending_async(self, short_code: str) -> tuple[int, Optional[datetime]]:
+        try:
+            async with get_async_redis().pipeline(transaction=False) as pipe:
+                for key in _PENDING_KEYS:
+                    pipe.hget(key, short_code)
+                values = await pipe.execute()
+        except redis.RedisError:
+            values = [None] * len(_PENDING_KEYS)
+        return self._merge_pending(short_code, values)
+
+    def _merge_pending(self, short_code: str, values: list) -> tuple[int, Optional[datetime]]:
+        pending_count, flushing_count, pending_last, flushing_last = values
+        count = int(pending_count or 0) + int(flushing_count or 0)
+        stamps = [datetime.fromisoformat(v) for v in (pending_last, flushing_last) if v]
+        with self._lock:
+            count += self._local_counts.get(short_code, 0)
+            if short_code in self._local_last:
+                stamps.append(self._local_last[short_code])
+        return count, max(stamps) if stamps else None
+
+    def flush(self, db: Session) -> list[str]:
+        return self._flush_redis(db) + self.flush_local(db)
+
+    def _flush_redis(self, db: Session) -> list[str]:
+        token = uuid.uuid4().hex
+        try:
+            r = get_redis()
+            if not r.set(FLUSH_LOCK_KEY, token, nx=True, ex=settings.click_flush_lock_seconds):
+                return []
+        except redis.RedisError:
+            return []
+        try:
+            counts, stamps, flush_id = r.eval(
+                _TAKE_SNAPSHOT_SCRIPT,
+                5,
+                PENDING_COUNTS_KEY,
+                PENDING_LAST_KEY,
+                FLUSHING_COUNTS_KEY,
+                FLUSHING_LAST_KEY,
+                FLUSHING_ID_KEY,
+                new_flush_id(),
+            )
+            counts, stamps = _pairs(counts), _pairs(stamps)
+            if not counts:
+                return []
+            now = datetime.utcnow()
+            batch = {
+                code: (int(n), datetime.fromisoformat(stamps[code]) if code in stamps else now)
+                for code, n in counts.items()
+            }
+            self._apply(db, batch, flush_id)
+            r.delete(FLUSHING_COUNTS_KEY, FLUSHING_LAST_KEY, FLUSHING_ID_KEY)
+            return list(batch)
+        except redis.RedisError:
+            return []
+        finally:
+            try:
+                r.eval(RELEASE_LOCK_SCRIPT, 1, FLUSH_LOCK_KEY, token)
+            except redis.RedisError:
+                pass
+
+    def flush_local(self, db: Session) -> list[str]:
+        with self._lock:
+            counts, self._local_counts = self._local_counts, Counter()
+            stamps, self._local_last = self._local_last, {}
+        if not counts:
+            return []
+        batch = {code: (n, stamps[code]) for code, n in counts.items()}
+        try:
+            self._apply(db, batch)
+        except Exception:
+            with self._lock:
+                self._local_counts.update(counts)
+                for code, stamp in stamps.items():
+                    current = self._local_last.get(code)
+                    if current is None or stamp > current:
+                        self._local_last[code] = stamp
+            raise
+        return list(batch)
+
+    def _apply(
+        self, db: Session, batch: dict[str, tuple[int, datetime]], flush_id: Optional[str] = None
+    ) -> None:
+        items = list(batch.items())
+        size = settings.click_flush_batch_size
+        try:
+            if flush_id and not mark_flush_applied(db, flush_id):
+                db.rollback()
+                return
+            if db.get_bind().dialect.name != 'postgresql':
+                rows = [{'code': code, 'clicks': count, 'clicked_at': stamp} for code, (count, stamp) in items]
+                for start in range(0, len(rows), size):
+                    db.execute(_FLUSH_ROWS_STMT, rows[start:start + size])
+                db.commit()
+                return
+            for start in range(0, len(items), size):
+                values, params = [], {}
+                for i, (code, (count, clicked_at)) in enumerate(items[start:start + size]):
+                    values.append(
+                        f'(CAST(:c{i} AS VARCHAR), CAST(:n{i} AS INTEGER), CAST(:t{i} AS TIMESTAMP))'
+                    )
+                    params.update({f'c{i}': code, f'n{i}': count, f't{i}': clicked_at})
+                db.execute(text(_FLUSH_SQL.format(values=', '.join(values))), params)
+            db.commit()
+        except Exception:
+            db.rollback()
+            raise
+
+
+click_counter = ClickCounter()
@@ -0,0 +1,27 @@
+import uuid
+from datetime import datetime, timedelta
+
+from sqlalchemy import delete
+from sqlalchemy.orm import Session
+
+from app.models.click_flush import ClickFlush
+
+# Long enough that a snapshot stranded in Redis by a failed cleanup is
+# retried while its record still exists.
+FLUSH_RECORD_TTL = timedelta(days=1)
+
+
+def new_flush_id() -> str:
+    return uuid.uuid4().hex
+
+
+def mark_flush_applied(db: Session, flush_id: str) -> bool:
+    # Runs inside the flush transaction. False means an earlier run already
+    # committed this snapshot and only its Redis copy was left behind.
+    if db.get(ClickFlush, flush_id) is not None:
+        return False
+    now = datetime.utcnow()
+    db.execute(delete(ClickFlush).where(ClickFlush.applied_at < now - FLUSH_RECORD_TTL))
+    db.add(ClickFlush(id=flush_id, applied_at=now))
+    db.flush()
+    return True
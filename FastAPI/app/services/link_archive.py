@@ -0,0 +1,129 @@
+import re
+from datetime import datetime
+
+from sqlalchemy import DateTime, insert, literal, select, text
+from sqlalchemy.orm import Session
+
+from app.models.click_rollup import ClickRollup, ClickRollupArchive
+from app.models.link import Link
+from app.models.link_archive import LinkArchive
+
+ARCHIVE_REASON_EXPIRED = 'expired'
+ARCHIVE_REASON_INACTIVE = 'inactive'
+
+ARCHIVED_COLUMNS = (
+    Link.id,
+    Link.short_code,
+    Link.original_url,
+    Link.created_at,
+    Link.expires_at,
+    Link.click_count,
+    Link.last_clicked_at,
+    Link.owner_id,
+)
+
+_ROLLUP_COLUMNS = ('id', 'link_id', 'granularity', 'bucket', 'referrer', 'country', 'count')
+
+# Both archive tables are partitioned by the same archived_at months.
+_PARTITIONED_TABLES = ('links_archive', 'click_rollups_archive')
+_PARTITION_NAME = re.compile(r'^(?:links_archive|click_rollups_archive)_p(\d{4})(\d{2})$')
+_PARTITIONS_SQL = """
+SELECT child.relname FROM pg_inherits
+JOIN pg_class parent ON parent.oid = pg_inherits.inhparent
+JOIN pg_class child ON child.oid = pg_inherits.inhrelid
+WHERE parent.relname IN ('links_archive', 'click_rollups_archive')
+"""
+
+
+def month_start(moment: datetime) -> datetime:
+    return moment.replace(day=1, hour=0, minute=0, second=0, microsecond=0)
+
+
+def add_months(month: datetime, months: int) -> datetime:
+    index = month.year * 12 + month.month - 1 + months
+    return month.replace(year=index // 12, month=index % 12 + 1)
+
+
+def partition_name(table: str, month: datetime) -> str:
+    return f'{table}_p{month:%Y%m}'
+
+
+def _is_postgres(db: Session) -> bool:
+    return db.get_bind().dialect.name == 'postgresql'
+
+
+def ensure_partition(db: Session, moment: datetime) -> None:
+    if not _is_postgres(db):
+        return
+    month = month_start(moment)
+    for table in _PARTITIONED_TABLES:
+        db.execute(
+            text(
+                f'CREATE TABLE IF NOT EXISTS {partition_name(table, month)} PARTITION OF {table} '
+                f"FOR VALUES FROM ('{month.isoformat()}') TO ('{add_months(month, 1).isoformat()}')"
+            )
+        )
+
+
+def drop_expired_partitions(db: Session, retention_months: int, now: datetime) -> list[str]:
+    # Retention is whole months: dropping a partition is instant, unlike a
+    # DELETE over millions of archived rows.
+    if retention_months <= 0 or not _is_postgres(db):
+        return []
+    cutoff = add_months(month_start(now), -retention_months)
+    dropped = []
+    for name in db.execute(text(_PARTITIONS_SQL)).scalars():
+        match = _PARTITION_NAME.match(name)
+        if match and datetime(int(match[1]), int(match[2]), 1) < cutoff:
+            db.execute(text(f'DROP TABLE IF EXISTS {name}'))
+            dropped.append(name)
+    db.commit()
+    return dropped
+
+
+def _reason(row, archived_at: datetime) -> str:
+    if row.expires_at and row.expires_at <= archived_at:
+        return ARCHIVE_REASON_EXPIRED
+    return ARCHIVE_REASON_INACTIVE
+
+
+def archive_rows(db: Session, rows: list, archived_at: datetime) -> None:
+    if not rows:
+        return
+    db.execute(
+        insert(LinkArchive),
+        [
+            {
+                **row._asdict(),
+                'click_count': row.click_count or 0,
+                'archived_at': archived_at,
+                'reason': _reason(row, archived_at),
+            }
+            for row in rows
+        ],
+    )
+
+
+def archive_rollups(db: Session, link_ids: list[int], archived_at: datetime) -> None:
+    # Must run before the links are deleted: the click_rollups foreign key
+    # cascades and would take the time series with them.
+    if not link_ids:
+        return
+    db.execute(
+        insert(ClickRollupArchive).from_select(
+            [*_ROLLUP_COLUMNS, 'archived_at'],
+            select(
+                *(getattr(ClickRollup, name) for name in _ROLLUP_COLUMNS),
+                literal(archived_at, DateTime()),
+            ).where(ClickRollup.link_id.in_(link_ids)),
+        )
+    )
+
+
+def latest_archived_query(short_code: str):
+    return (
+        select(LinkArchive)
+        .where(LinkArchive.short_code == short_code)
+        .order_by(LinkArchive.archived_at.desc())
+        .limit(1)
+    )
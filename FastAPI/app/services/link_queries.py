@@ -0,0 +1,47 @@
+import math
+from datetime import datetime
+
+from sqlalchemy import or_
+
+from app.config import settings
+from app.core.serialization import dumps_response
+from app.models.link import Link
+
+
+def is_expired(link: Link) -> bool:
+    if not link.expires_at:
+        return False
+    return datetime.utcnow() >= link.expires_at
+
+
+def not_expired_clause():
+    return or_(Link.expires_at.is_(None), Link.expires_at > datetime.utcnow())
+
+
+def search_payload(link: Link) -> dict:
+    return {
+        'short_code': link.short_code,
+        'original_url': link.original_url,
+        'created_at': link.created_at,
+        'expires_at': link.expires_at,
+    }
+
+
+def search_cache_key(url_normalized: str) -> str:
+    # Entries hold the serialized response body; the prefix keeps them apart
+    # from the id lists cached under the bare URL by earlier releases.
+    return f'json:{url_normalized}'
+
+
+def search_body(links: list[Link]) -> str:
+    return dumps_response([search_payload(link) for link in links]).decode('utf-8')
+
+
+def search_ttl(links: list[Link]) -> int:
+    # A cached body must not outlive the first of its links to expire.
+    ttl = settings.cache_ttl_seconds
+    now = datetime.utcnow()
+    for link in links:
+        if link.expires_at:
+            ttl = min(ttl, max(1, math.ceil((link.expires_at - now).total_seconds())))
+    return ttl
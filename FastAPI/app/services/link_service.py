@@ -1,42 +1,107 @@
-import random
-import string
+import time
 from datetime import datetime, timedelta
 from typing import Optional
 
-from sqlalchemy import func
+from sqlalchemy import delete, func, or_, select
+from sqlalchemy.exc import IntegrityError
 from sqlalchemy.orm import Session
 
 from app.config import settings
+from app.core.urls import normalize_url, url_domain, url_hash
 from app.core.cache import cache
+from app.models.click_rollup import ClickRollupArchive
 from app.models.link import Link
+from app.models.link_archive import LinkArchive
 from app.schemas.link import LinkCreate, LinkUpdate
+from app.services.bulk_links import (
+    BulkItem,
+    build_rows,
+    collect_results,
+    created_codes,
+    error_result,
+    insert_ignoring_conflicts,
+    split_items,
+)
+from app.services.cleanup_progress import cleanup_progress
+from app.services.click_analytics import (
+    click_analytics,
+    timeseries_points,
+    timeseries_query,
+    timeseries_range,
+)
+from app.services.click_counter import click_counter
+from app.services.link_archive import (
+    ARCHIVED_COLUMNS,
+    archive_rollups,
+    archive_rows,
+    drop_expired_partitions,
+    ensure_partition,
+    latest_archived_query,
+)
+from app.services.link_queries import (
+    is_expired,
+    not_expired_clause,
+    search_body,
+    search_cache_key,
+    search_ttl,
+)
+from app.services.link_view import LinkView
+from app.services.short_codes import code_generator, is_unique_violation
 
-CACHE_KEY_LINK = 'link:{}'
-CACHE_KEY_STATS = 'stats:{}'
-CACHE_KEY_SEARCH_PREFIX = 'search:'
+CACHE_NS_LINK = 'link'
+CACHE_NS_STATS = 'stats'
+CACHE_NS_SEARCH = 'search'
 
 
-def _generate_short_code(length: int = 0) -> str:
-    length = length or settings.short_code_length
-    alphabet = string.ascii_lowercase + string.digits
-    return ''.join(random.choices(alphabet, k=length))
+def _invalidate_link_cache(short_code: str) -> None:
+    cache.invalidate(
+        {CACHE_NS_LINK: [short_code], CACHE_NS_STATS: [short_code]},
+        bump=(CACHE_NS_SEARCH,),
+    )
 
 
-def _invalidate_link_cache(short_code: str) -> None:
-    cache.delete(CACHE_KEY_LINK.format(short_code))
-    cache.delete(CACHE_KEY_STATS.format(short_code))
-    cache.delete_pattern(CACHE_KEY_SEARCH_PREFIX + '*')
+def _refresh_link_cache(short_code: str, payload: Optional[dict]) -> None:
+    # Filled from the primary right after the write: after a bare invalidate
+    # the next miss could read a replica that has not replayed the write yet
+    # and cache the old row for the full TTL.
+    _invalidate_link_cache(short_code)
+    for namespace in (CACHE_NS_LINK, CACHE_NS_STATS):
+        if payload is not None:
+            cache.ns_set(namespace, short_code, payload)
+        elif settings.negative_cache_ttl_seconds:
+            cache.ns_set_missing(namespace, short_code, settings.negative_cache_ttl_seconds)
+
+
+def _invalidate_created(results) -> None:
+    # Drops negative-cache tombstones left by lookups made before the codes existed.
+    codes = created_codes(results)
+    cache.invalidate({CACHE_NS_LINK: codes, CACHE_NS_STATS: codes}, bump=(CACHE_NS_SEARCH,))
+
+
+def track_click(short_code: str, referrer: Optional[str] = None, country: Optional[str] = None) -> None:
+    short_code = short_code.lower()
+    click_counter.record(short_code)
+    if settings.click_analytics_enabled:
+        click_analytics.record(short_code, referrer, country)
 
 
-def _is_expired(link: Link) -> bool:
-    if not link.expires_at:
-        return False
-    return datetime.utcnow() >= link.expires_at
+async def track_click_async(
+    short_code: str, referrer: Optional[str] = None, country: Optional[str] = None
+) -> None:
+    short_code = short_code.lower()
+    await click_counter.record_async(short_code)
+    if settings.click_analytics_enabled:
+        await click_analytics.record_async(short_code, referrer, country)
+
+
+def _merge_pending_clicks(view: LinkView) -> LinkView:
+    return view.with_pending_clicks(*click_counter.pending(view.short_code))
 
 
 class LinkService:
-    def __init__(self, db: Session, base_url: str = ''):
+    def __init__(self, db: Session, base_url: str = '', read_db: Optional[Session] = None):
         self.db = db
+        self.read_db = read_db or db
         self.base_url = base_url.rstrip('/')
 
     def _link_to_response(self, link: Link) -> dict:
@@ -50,54 +115,104 @@ class LinkService:
         }
 
     def create(self, data: LinkCreate, owner_id: Optional[int] = None) -> Link:
-        short_code = data.custom_alias
-        if short_code:
-            short_code = short_code.strip().lower()
-            if self.db.query(Link).filter(Link.short_code == short_code).first():
-                raise ValueError('Alias already taken')
-        else:
-            while True:
-                short_code = _generate_short_code()
-                if not self.db.query(Link).filter(Link.short_code == short_code).first():
-                    break
+        alias = data.custom_alias.strip().lower() if data.custom_alias else None
+        for _ in range(settings.short_code_max_attempts):
+            link = Link(
+                short_code=alias or code_generator.next_code(self.db),
+                original_url=data.original_url,
+                expires_at=data.expires_at,
+                owner_id=owner_id,
+            )
+            self.db.add(link)
+            try:
+                self.db.commit()
+            except IntegrityError as e:
+                self.db.rollback()
+                if not is_unique_violation(e):
+                    raise
+                if alias:
+                    raise ValueError('Alias already taken')
+                continue
+            _invalidate_link_cache(link.short_code)
+            return link
+        raise RuntimeError('Could not allocate a unique short code')
 
-        link = Link(
-            short_code=short_code,
-            original_url=data.original_url,
-            expires_at=data.expires_at,
-            owner_id=owner_id,
-        )
-        self.db.add(link)
+    def create_many(self, batch: list[BulkItem], owner_id: Optional[int] = None) -> list[dict]:
+        results, pending = split_items(batch)
+        stmt = insert_ignoring_conflicts(self.db.get_bind().dialect.name)
+        for _ in range(settings.short_code_max_attempts):
+            if not pending:
+                break
+            codes = code_generator.next_codes(self.db, sum(1 for _, _, alias in pending if not alias))
+            rows = build_rows(pending, codes, owner_id)
+            inserted = set(self.db.execute(stmt, rows).scalars())
+            pending = collect_results(pending, rows, inserted, results, self.base_url)
         self.db.commit()
-        self.db.refresh(link)
-        return link
+        for index, _, _ in pending:
+            results[index] = error_result(index, 'Could not allocate a unique short code')
+        _invalidate_created(results.values())
+        return [results[index] for index, _ in batch]
 
-    def get_by_short_code(self, short_code: str, use_cache: bool = True) -> Optional[Link]:
-        short_code = short_code.lower()
+    def _load_view_payload(self, short_code: str) -> Optional[dict]:
+        link = self.read_db.query(Link).filter(Link.short_code == short_code).first()
+        if link is None and self.read_db is not self.db:
+            # The replica may not have caught up with a link created moments ago;
+            # confirm on the primary before caching a tombstone.
+            link = self.db.query(Link).filter(Link.short_code == short_code).first()
+        if not link or is_expired(link):
+            return None
+        return LinkView.from_link(link).to_payload()
+
+    def _get_view(self, namespace: str, short_code: str, use_cache: bool) -> Optional[LinkView]:
         if use_cache:
-            cached = cache.get(CACHE_KEY_LINK.format(short_code))
-            if cached:
-                link = self.db.query(Link).filter(Link.short_code == short_code).first()
-                if link and not _is_expired(link):
-                    return link
+            payload = cache.ns_get_or_load(
+                namespace,
+                short_code,
+                lambda: self._load_view_payload(short_code),
+                negative_ttl=settings.negative_cache_ttl_seconds,
+            )
+            if not payload:
                 return None
+            view = LinkView.from_payload(payload)
+            if view is not None:
+                return None if view.is_expired else view
+            # Cached in an older, slimmer format: reload and overwrite it.
+        payload = self._load_view_payload(short_code)
+        if payload is not None:
+            cache.ns_set(namespace, short_code, payload)
+        return LinkView.from_payload(payload)
 
-        link = self.db.query(Link).filter(Link.short_code == short_code).first()
-        if not link or _is_expired(link):
-            return None
-        cache.set(CACHE_KEY_LINK.format(short_code), {'original_url': link.original_url})
-        return link
+    def get_by_short_code(self, short_code: str, use_cache: bool = True) -> Optional[LinkView]:
+        return self._get_view(CACHE_NS_LINK, short_code.lower(), use_cache)
+
+    def resolve_cached(self, short_code: str) -> Optional[str]:
+        view = self.get_by_short_code(short_code)
+        return view.original_url if view else None
 
-    def resolve_and_track(self, short_code: str) -> Optional[str]:
+    def resolve_and_track(
+        self, short_code: str, referrer: Optional[str] = None, country: Optional[str] = None
+    ) -> Optional[str]:
         link = self.get_by_short_code(short_code, use_cache=False)
         if not link:
             return None
-        link.click_count += 1
-        link.last_clicked_at = datetime.utcnow()
-        self.db.commit()
-        _invalidate_link_cache(short_code)
+        track_click(link.short_code, referrer, country)
         return link.original_url
 
+    def flush_clicks(self) -> int:
+        flushed = click_counter.flush(self.db)
+        cache.ns_delete(CACHE_NS_STATS, *flushed)
+        if settings.click_analytics_enabled:
+            click_analytics.flush(self.db)
+        return len(flushed)
+
+    def flush_local_clicks(self) -> int:
+        flushed = click_counter.flush_local(self.db)
+        if flushed:
+            cache.ns_delete(CACHE_NS_STATS, *flushed)
+        if settings.click_analytics_enabled:
+            click_analytics.flush_local(self.db)
+        return len(flushed)
+
     def delete(self, short_code: str, owner_id: Optional[int] = None) -> bool:
         short_code = short_code.lower()
         link = self.db.query(Link).filter(Link.short_code == short_code).first()
@@ -107,7 +222,7 @@ class LinkService:
             return False
         self.db.delete(link)
         self.db.commit()
-        _invalidate_link_cache(short_code)
+        _refresh_link_cache(short_code, None)
         return True
 
     def update(self, short_code: str, data: LinkUpdate, owner_id: Optional[int] = None) -> Optional[Link]:
@@ -117,79 +232,155 @@ class LinkService:
             return None
         if owner_id is not None and link.owner_id != owner_id:
             return None
-        if _is_expired(link):
+        if is_expired(link):
             return None
         link.original_url = data.original_url
         self.db.commit()
         self.db.refresh(link)
-        _invalidate_link_cache(short_code)
+        _refresh_link_cache(short_code, LinkView.from_link(link).to_payload())
         return link
 
-    def get_stats(self, short_code: str, use_cache: bool = True) -> Optional[Link]:
-        short_code = short_code.lower()
-        if use_cache:
-            cached = cache.get(CACHE_KEY_STATS.format(short_code))
-            if cached:
-                link = self.db.query(Link).filter(Link.short_code == short_code).first()
-                if link and not _is_expired(link):
-                    return link
-                return None
+    def get_stats(self, short_code: str, use_cache: bool = True) -> Optional[LinkView]:
+        view = self._get_view(CACHE_NS_STATS, short_code.lower(), use_cache)
+        return _merge_pending_clicks(view) if view else None
 
-        link = self.db.query(Link).filter(Link.short_code == short_code).first()
-        if not link or _is_expired(link):
+    def get_timeseries(
+        self,
+        short_code: str,
+        granularity: str = 'hour',
+        start: Optional[datetime] = None,
+        end: Optional[datetime] = None,
+        group_by: Optional[str] = None,
+    ) -> Optional[dict]:
+        start, end = timeseries_range(granularity, start, end)
+        link_id = self.read_db.execute(
+            select(Link.id).where(Link.short_code == short_code.lower(), not_expired_clause())
+        ).scalar()
+        if link_id is None:
             return None
-        cache.set(
-            CACHE_KEY_STATS.format(short_code),
-            {
-                'short_code': link.short_code,
-                'original_url': link.original_url,
-                'created_at': link.created_at.isoformat(),
-                'click_count': link.click_count,
-                'last_clicked_at': link.last_clicked_at.isoformat() if link.last_clicked_at else None,
-                'expires_at': link.expires_at.isoformat() if link.expires_at else None,
-            },
-        )
-        return link
+        rows = self.read_db.execute(timeseries_query(link_id, granularity, start, end, group_by)).all()
+        return {
+            'short_code': short_code.lower(),
+            'granularity': granularity,
+            'start': start,
+            'end': end,
+            'points': timeseries_points(rows, group_by),
+        }
 
     def cleanup_inactive(self, inactive_days: Optional[int] = None) -> int:
+        # Expired and inactive links leave the hot table; with archiving on
+        # they and their click rollups are copied to the archive tables in
+        # the same transaction.
         days = inactive_days or settings.link_inactive_days
-        threshold = datetime.utcnow() - timedelta(days=days)
-
-        links_q = self.db.query(Link).filter(
-            func.coalesce(Link.last_clicked_at, Link.created_at) < threshold
+        now = datetime.utcnow()
+        threshold = now - timedelta(days=days)
+        batch_size = settings.cleanup_batch_size
+        archive = settings.link_archive_enabled
+        # Locked until the batch commits, so a click flush cannot revive a link
+        # between archiving its rollups and deleting it.
+        stale_ids = (
+            select(Link.id)
+            .where(
+                or_(
+                    func.coalesce(Link.last_clicked_at, Link.created_at) < threshold,
+                    Link.expires_at <= now,
+                )
+            )
+            .limit(batch_size)
+            .with_for_update(skip_locked=True)
         )
-        links = links_q.all()
-        if not links:
-            return 0
+        returning = ARCHIVED_COLUMNS if archive else (Link.short_code,)
 
-        for link in links:
-            self.db.delete(link)
-        self.db.commit()
+        total = 0
+        cleanup_progress.start()
+        try:
+            if archive:
+                ensure_partition(self.db, now)
+                self.db.commit()
+            while True:
+                ids = self.db.execute(stale_ids).scalars().all()
+                rows = []
+                if ids:
+                    if archive:
+                        archive_rollups(self.db, ids, now)
+                    rows = self.db.execute(
+                        delete(Link)
+                        .where(Link.id.in_(ids))
+                        .returning(*returning)
+                        .execution_options(synchronize_session=False)
+                    ).all()
+                    if archive:
+                        archive_rows(self.db, rows, now)
+                self.db.commit()
+                codes = [row.short_code for row in rows]
+                if codes:
+                    cache.invalidate({CACHE_NS_LINK: codes, CACHE_NS_STATS: codes})
+                    cleanup_progress.advance(len(codes))
+                    total += len(codes)
+                if len(codes) < batch_size:
+                    break
+                time.sleep(settings.cleanup_batch_pause_seconds)
+        except Exception as e:
+            self.db.rollback()
+            cleanup_progress.finish(error=str(e))
+            raise
+        cleanup_progress.finish()
 
-        cache.delete_pattern('link:*')
-        cache.delete_pattern('stats:*')
-        cache.delete_pattern(f'{CACHE_KEY_SEARCH_PREFIX}*')
+        if total:
+            cache.bump(CACHE_NS_SEARCH)
+        if archive:
+            drop_expired_partitions(self.db, settings.link_archive_retention_months, now)
+        return total
 
-        return len(links)
+    def get_archived(self, short_code: str) -> Optional[LinkArchive]:
+        return self.read_db.execute(latest_archived_query(short_code.lower())).scalar()
 
-    def search_by_original_url(self, original_url: str, use_cache: bool = True) -> list[Link]:
-        url_normalized = original_url.strip().lower()
-        if not url_normalized.startswith(('http://', 'https://')):
-            url_normalized = 'https://' + url_normalized
-        cache_key = CACHE_KEY_SEARCH_PREFIX + url_normalized
+    def get_archived_timeseries(
+        self,
+        short_code: str,
+        granularity: str = 'hour',
+        start: Optional[datetime] = None,
+        end: Optional[datetime] = None,
+        group_by: Optional[str] = None,
+    ) -> Optional[dict]:
+        archived = self.get_archived(short_code)
+        if archived is None:
+            return None
+        start, end = timeseries_range(granularity, start, end, archived.archived_at)
+        rows = self.read_db.execute(
+            timeseries_query(archived.id, granularity, start, end, group_by, ClickRollupArchive)
+        ).all()
+        return {
+            'short_code': archived.short_code,
+            'granularity': granularity,
+            'start': start,
+            'end': end,
+            'points': timeseries_points(rows, group_by),
+        }
+
+    def search_by_original_url_json(self, original_url: str, use_cache: bool = True) -> str:
+        url_normalized = normalize_url(original_url)
+        key = search_cache_key(url_normalized)
         if use_cache:
-            cached = cache.get(cache_key)
-            if cached is not None:
-                ids = cached.get('ids', [])
-                if ids:
-                    return self.db.query(Link).filter(Link.id.in_(ids)).all()
-                return []
+            body = cache.ns_get_raw(CACHE_NS_SEARCH, key)
+            if body is not None:
+                return body
 
         links = (
-            self.db.query(Link)
-            .filter(func.lower(Link.original_url) == url_normalized)
+            self.read_db.query(Link)
+            .filter(Link.url_hash == url_hash(url_normalized), Link.normalized_url == url_normalized)
+            .all()
+        )
+        valid = [l for l in links if not is_expired(l)]
+        body = search_body(valid)
+        cache.ns_set_raw(CACHE_NS_SEARCH, key, body, search_ttl(valid))
+        return body
+
+    def search_by_domain(self, domain: str, limit: int = 100) -> list[Link]:
+        return (
+            self.read_db.query(Link)
+            .filter(Link.domain == url_domain(normalize_url(domain)), not_expired_clause())
+            .order_by(Link.id.desc())
+            .limit(limit)
             .all()
         )
-        valid = [l for l in links if not _is_expired(l)]
-        cache.set(cache_key, {'ids': [l.id for l in valid]})
-        return valid
@@ -0,0 +1,72 @@
+from dataclasses import dataclass, replace
+from datetime import datetime
+from typing import Optional
+
+from app.models.link import Link
+
+# Fields every cached link/stats payload must carry to be rendered without
+# touching the database; older, slimmer payloads are treated as a miss.
+VIEW_FIELDS = ('short_code', 'original_url', 'created_at', 'click_count', 'last_clicked_at', 'expires_at')
+
+
+def _parse_datetime(value: Optional[str]) -> Optional[datetime]:
+    return datetime.fromisoformat(value) if value else None
+
+
+def _format_datetime(value: Optional[datetime]) -> Optional[str]:
+    return value.isoformat() if value else None
+
+
+@dataclass(slots=True, frozen=True)
+class LinkView:
+    short_code: str
+    original_url: str
+    created_at: datetime
+    click_count: int = 0
+    last_clicked_at: Optional[datetime] = None
+    expires_at: Optional[datetime] = None
+
+    @classmethod
+    def from_link(cls, link: Link) -> 'LinkView':
+        return cls(
+            short_code=link.short_code,
+            original_url=link.original_url,
+            created_at=link.created_at,
+            click_count=link.click_count or 0,
+            last_clicked_at=link.last_clicked_at,
+            expires_at=link.expires_at,
+        )
+
+    @classmethod
+    def from_payload(cls, payload: Optional[dict]) -> Optional['LinkView']:
+        if not payload or any(name not in payload for name in VIEW_FIELDS):
+            return None
+        return cls(
+            short_code=payload['short_code'],
+            original_url=payload['original_url'],
+            created_at=_parse_datetime(payload['created_at']),
+            click_count=payload['click_count'] or 0,
+            last_clicked_at=_parse_datetime(payload['last_clicked_at']),
+            expires_at=_parse_datetime(payload['expires_at']),
+        )
+
+    def to_payload(self) -> dict:
+        return {
+            'short_code': self.short_code,
+            'original_url': self.original_url,
+            'created_at': _format_datetime(self.created_at),
+            'click_count': self.click_count,
+            'last_clicked_at': _format_datetime(self.last_clicked_at),
+            'expires_at': _format_datetime(self.expires_at),
+        }
+
+    @property
+    def is_expired(self) -> bool:
+        return self.expires_at is not None and datetime.utcnow() >= self.expires_at
+
+    def with_pending_clicks(self, count: int, last_clicked_at: Optional[datetime]) -> 'LinkView':
+        if not count and not last_clicked_at:
+            return self
+        if self.last_clicked_at and (last_clicked_at is None or last_clicked_at < self.last_clicked_at):
+            last_clicked_at = self.last_clicked_at
+        return replace(self, click_count=self.click_count + count, last_clicked_at=last_clicked_at)
@@ -0,0 +1,117 @@
+import random
+import string
+import threading
+from collections import deque
+
+from sqlalchemy import func, select
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import Session
+
+from app.config import settings
+from app.models.link import short_code_sequence
+
+BASE36_ALPHABET = string.digits + string.ascii_lowercase
+
+
+def encode_base36(number: int, length: int = 0) -> str:
+    chars = []
+    while number:
+        number, rem = divmod(number, 36)
+        chars.append(BASE36_ALPHABET[rem])
+    return ''.join(reversed(chars)).rjust(length, BASE36_ALPHABET[0])
+
+
+def scramble(number: int, length: int) -> int:
+    # Affine map modulo 36**length; bijective because the multiplier is
+    # coprime with 36, so distinct ids never produce the same code.
+    domain = 36 ** length
+    return (number * settings.short_code_scramble_multiplier + settings.short_code_scramble_offset) % domain
+
+
+def code_for_id(number: int) -> str:
+    length = settings.short_code_length
+    while number >= 36 ** length:
+        length += 1
+    if settings.short_code_scramble:
+        number = scramble(number, length)
+    return encode_base36(number, length)
+
+
+def is_unique_violation(exc: IntegrityError) -> bool:
+    orig = exc.orig
+    code = getattr(orig, 'pgcode', None) or getattr(orig, 'sqlstate', None)
+    if code:
+        return code == '23505'
+    return 'unique' in str(orig).lower()
+
+
+class RandomCodeGenerator:
+    def next_code(self, db: Session) -> str:
+        return self.next_codes(db, 1)[0]
+
+    async def next_code_async(self, db: AsyncSession) -> str:
+        return (await self.next_codes_async(db, 1))[0]
+
+    def next_codes(self, db: Session, count: int) -> list[str]:
+        return [self._random_code() for _ in range(count)]
+
+    async def next_codes_async(self, db: AsyncSession, count: int) -> list[str]:
+        return [self._random_code() for _ in range(count)]
+
+    def _random_code(self) -> str:
+        alphabet = string.ascii_lowercase + string.digits
+        return ''.join(random.choices(alphabet, k=settings.short_code_length))
+
+
+class SequenceCodeGenerator(RandomCodeGenerator):
+    def __init__(self, block_size: int):
+        self.block_size = block_size
+        self._ids: deque[int] = deque()
+        self._lock = threading.Lock()
+
+    def _block_query(self, missing: int):
+        return select(short_code_sequence.next_value()).select_from(
+            func.generate_series(1, max(missing, self.block_size))
+        )
+
+    def _take(self, count: int) -> list[int]:
+        with self._lock:
+            return [self._ids.popleft() for _ in range(min(count, len(self._ids)))]
+
+    def _keep(self, ids: list[int]) -> None:
+        with self._lock:
+            self._ids.extend(ids)
+
+    def next_codes(self, db: Session, count: int) -> list[str]:
+        if not db.get_bind().dialect.supports_sequences:
+            return super().next_codes(db, count)
+        ids = self._take(count)
+        missing = count - len(ids)
+        if missing:
+            fetched = list(db.execute(self._block_query(missing)).scalars())
+            ids.extend(fetched[:missing])
+            self._keep(fetched[missing:])
+        return [code_for_id(number) for number in ids]
+
+    async def next_codes_async(self, db: AsyncSession, count: int) -> list[str]:
+        if not db.get_bind().dialect.supports_sequences:
+            return await super().next_codes_async(db, count)
+        ids = self._take(count)
+        missing = count - len(ids)
+        if missing:
+            fetched = list((await db.execute(self._block_query(missing))).scalars())
+            ids.extend(fetched[:missing])
+            self._keep(fetched[missing:])
+        return [code_for_id(number) for number in ids]
+
+
+def _build_generator():
+    if settings.short_code_strategy == 'random':
+        return RandomCodeGenerator()
+    if settings.short_code_strategy == 'sequence':
+        return SequenceCodeGenerator(settings.short_code_block_size)
+    raise ValueError(f'Unknown short code strategy: {settings.short_code_strategy}')
+
+
+code_generator = _build_generator()
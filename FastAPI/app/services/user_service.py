@@ -2,7 +2,7 @@ from typing import Optional
 
 from sqlalchemy.orm import Session
 
-from app.core.security import get_password_hash
+from app.core.security import invalidate_principal, password_hasher
 from app.models.user import User
 from app.schemas.user import UserCreate
 
@@ -20,9 +20,10 @@ class UserService:
     def create(self, data: UserCreate) -> User:
         user = User(
             email=data.email.lower(),
-            hashed_password=get_password_hash(data.password),
+            hashed_password=password_hasher.hash(data.password),
         )
         self.db.add(user)
         self.db.commit()
         self.db.refresh(user)
+        invalidate_principal(user.id)
         return user
@@ -0,0 +1,46 @@
+import math
+from typing import Optional
+
+
+def percentile(sorted_values: list[float], fraction: float) -> float:
+    if not sorted_values:
+        return 0.0
+    rank = max(1, math.ceil(fraction * len(sorted_values)))
+    return sorted_values[rank - 1]
+
+
+def summarize(samples: dict[str, list[tuple[float, bool]]], elapsed: float) -> dict:
+    endpoints = {}
+    for name, values in sorted(samples.items()):
+        latencies = sorted(latency for latency, _ in values)
+        errors = sum(1 for _, ok in values if not ok)
+        endpoints[name] = {
+            'requests': len(values),
+            'errors': errors,
+            'rps': round(len(values) / elapsed, 1) if elapsed else 0.0,
+            'mean_ms': round(sum(latencies) / len(latencies) * 1000, 3) if latencies else 0.0,
+            'p50_ms': round(percentile(latencies, 0.50) * 1000, 3),
+            'p95_ms': round(percentile(latencies, 0.95) * 1000, 3),
+            'p99_ms': round(percentile(latencies, 0.99) * 1000, 3),
+            'max_ms': round(latencies[-1] * 1000, 3) if latencies else 0.0,
+        }
+    total = sum(len(values) for values in samples.values())
+    return {
+        'elapsed_seconds': round(elapsed, 3),
+        'requests': total,
+        'rps': round(total / elapsed, 1) if elapsed else 0.0,
+        'endpoints': endpoints,
+    }
+
+
+def regressions(current: dict, baseline: dict, tolerance: float, metric: str = 'p95_ms') -> list[str]:
+    found = []
+    for name, stats in current['endpoints'].items():
+        previous: Optional[dict] = baseline.get('endpoints', {}).get(name)
+        if not previous or not previous.get(metric):
+            continue
+        if stats[metric] > previous[metric] * (1 + tolerance):
+            found.append(f'{name}: {metric} {previous[metric]} -> {stats[metric]}')
+        if stats['errors'] > previous.get('errors', 0):
+            found.append(f"{name}: errors {previous.get('errors', 0)} -> {stats['errors']}")
+    return found
@@ -0,0 +1,163 @@
+import argparse
+import asyncio
+import json
+import sys
+import time
+from collections import defaultdict
+from contextlib import AsyncExitStack
+from typing import Optional
+
+import httpx
+
+from benchmarks.report import regressions, summarize
+from benchmarks.workload import Workload, parse_mix
+
+API = '/api/v1/links'
+
+
+def _parse_args(argv: Optional[list[str]] = None) -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description='Replay a Zipfian shortener workload and report latency.')
+    parser.add_argument('--base-url', default='', help='Target a running server instead of an in-process app')
+    parser.add_argument('--database-url', default='', help='In-process mode: database to use (default: temp SQLite)')
+    parser.add_argument('--real-redis', action='store_true', help='In-process mode: use REDIS_URL instead of fakeredis')
+    parser.add_argument('--links', type=int, default=2000, help='Links to seed before measuring')
+    parser.add_argument('--requests', type=int, default=20000, help='Measured requests')
+    parser.add_argument('--warmup', type=int, default=1000, help='Unmeasured requests before measuring')
+    parser.add_argument('--concurrency', type=int, default=32)
+    parser.add_argument('--mix', default='redirect=80,stats=10,search=5,shorten=5')
+    parser.add_argument('--zipf', type=float, default=1.1, help='Zipf exponent for link popularity')
+    parser.add_argument('--seed', type=int, default=42)
+    parser.add_argument('--output', default='-', help='Write the JSON report here (default: stdout)')
+    parser.add_argument('--baseline', default='', help='Compare against a previous JSON report')
+    parser.add_argument('--tolerance', type=float, default=0.2, help='Allowed p95 regression vs baseline')
+    return parser.parse_args(argv)
+
+
+async def _seed(client: httpx.AsyncClient, count: int, batch: int = 500) -> list[tuple[str, str]]:
+    links = []
+    for start in range(0, count, batch):
+        body = [{'original_url': f'https://seed.example/{i}'} for i in range(start, min(count, start + batch))]
+        response = await client.post(f'{API}/shorten/bulk', json=body)
+        response.raise_for_status()
+        for line in response.text.splitlines():
+            item = json.loads(line)
+            if 'short_code' in item:
+                links.append((item['short_code'], item['original_url']))
+    if not links:
+        raise RuntimeError('Seeding created no links')
+    return links
+
+
+async def _request(client: httpx.AsyncClient, workload: Workload, operation: str) -> bool:
+    if operation == 'shorten':
+        response = await client.post(f'{API}/shorten', json={'original_url': workload.new_url()})
+        return response.status_code == 200
+    code, url = workload.pick_link()
+    if operation == 'redirect':
+        response = await client.get(f'{API}/{code}', follow_redirects=False)
+        return response.status_code == 307
+    if operation == 'stats':
+        response = await client.get(f'{API}/{code}/stats')
+    else:
+        response = await client.get(f'{API}/search/', params={'original_url': url})
+    return response.status_code == 200
+
+
+async def _replay(client: httpx.AsyncClient, workload: Workload, total: int, concurrency: int):
+    samples: dict[str, list[tuple[float, bool]]] = defaultdict(list)
+    remaining = total
+
+    async def worker() -> None:
+        nonlocal remaining
+        while remaining > 0:
+            remaining -= 1
+            operation = workload.next_operation()
+            started = time.perf_counter()
+            try:
+                ok = await _request(client, workload, operation)
+            except httpx.HTTPError:
+                ok = False
+            samples[operation].append((time.perf_counter() - started, ok))
+
+    started = time.perf_counter()
+    await asyncio.gather(*(worker() for _ in range(concurrency)))
+    return samples, time.perf_counter() - started
+
+
+async def _client(stack: AsyncExitStack, args: argparse.Namespace) -> httpx.AsyncClient:
+    if args.base_url:
+        return await stack.enter_async_context(httpx.AsyncClient(base_url=args.base_url, timeout=30))
+
+    from benchmarks import stand_ins
+
+    stand_ins.configure_environment(args.database_url)
+    from app.main import app
+
+    if not args.real_redis:
+        stand_ins.install_fake_redis()
+    await stack.enter_async_context(app.router.lifespan_context(app))
+    transport = httpx.ASGITransport(app=app)
+    return await stack.enter_async_context(
+        httpx.AsyncClient(transport=transport, base_url='http://bench', timeout=30)
+    )
+
+
+def _environment(args: argparse.Namespace) -> dict:
+    if args.base_url:
+        return {'target': args.base_url}
+    from app.config import settings
+
+    return {
+        'target': 'in-process',
+        'database': settings.database_url.split('://', 1)[0],
+        'redis': 'redis' if args.real_redis else 'fakeredis',
+        'async_endpoints': settings.async_endpoints,
+        'redirect_cache_first': settings.redirect_cache_first,
+        'l1_cache_enabled': settings.l1_cache_enabled,
+        'cache_ttl_seconds': settings.cache_ttl_seconds,
+    }
+
+
+async def run(args: argparse.Namespace) -> dict:
+    mix = parse_mix(args.mix)
+    async with AsyncExitStack() as stack:
+        client = await _client(stack, args)
+        links = await _seed(client, args.links)
+        workload = Workload(mix, links, args.zipf, args.seed)
+        if args.warmup:
+            await _replay(client, workload, args.warmup, args.concurrency)
+        samples, elapsed = await _replay(client, workload, args.requests, args.concurrency)
+    report = summarize(samples, elapsed)
+    report['config'] = {
+        'links': len(links),
+        'requests': args.requests,
+        'warmup': args.warmup,
+        'concurrency': args.concurrency,
+        'mix': mix,
+        'zipf': args.zipf,
+        'seed': args.seed,
+    }
+    report['environment'] = _environment(args)
+    return report
+
+
+def main(argv: Optional[list[str]] = None) -> int:
+    args = _parse_args(argv)
+    report = asyncio.run(run(args))
+    text = json.dumps(report, indent=2)
+    if args.output == '-':
+        print(text)
+    else:
+        with open(args.output, 'w') as f:
+            f.write(text + '\n')
+    if args.baseline:
+        with open(args.baseline) as f:
+            found = regressions(report, json.load(f), args.tolerance)
+        for line in found:
+            print(f'REGRESSION {line}', file=sys.stderr)
+        return 1 if found else 0
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
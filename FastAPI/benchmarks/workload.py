@@ -0,0 +1,50 @@
+import bisect
+import random
+from itertools import accumulate
+
+OPERATIONS = ('redirect', 'stats', 'search', 'shorten')
+
+
+def parse_mix(spec: str) -> dict[str, float]:
+    mix = {}
+    for part in spec.split(','):
+        name, _, weight = part.partition('=')
+        name = name.strip()
+        if name not in OPERATIONS:
+            raise ValueError(f'Unknown operation in mix: {name}')
+        mix[name] = float(weight or 1)
+    if not any(mix.values()):
+        raise ValueError('Mix must contain at least one operation with a positive weight')
+    return mix
+
+
+class ZipfSampler:
+    # Rank k (1-based) is drawn with probability proportional to 1 / k**s,
+    # so a few links take most of the traffic, as with real short links.
+    def __init__(self, size: int, exponent: float, rng: random.Random):
+        self.rng = rng
+        self._cumulative = list(accumulate(1 / rank ** exponent for rank in range(1, size + 1)))
+
+    def sample(self) -> int:
+        return bisect.bisect_left(self._cumulative, self.rng.random() * self._cumulative[-1])
+
+
+class Workload:
+    def __init__(self, mix: dict[str, float], links: list[tuple[str, str]], exponent: float, seed: int):
+        self.rng = random.Random(seed)
+        self.links = links
+        self._names = list(mix)
+        self._cumulative = list(accumulate(mix.values()))
+        self._popularity = ZipfSampler(len(links), exponent, self.rng)
+        # Popularity ranks are assigned to links in random order, not by age.
+        self._order = list(range(len(links)))
+        self.rng.shuffle(self._order)
+
+    def next_operation(self) -> str:
+        return self._names[bisect.bisect_left(self._cumulative, self.rng.random() * self._cumulative[-1])]
+
+    def pick_link(self) -> tuple[str, str]:
+        return self.links[self._order[self._popularity.sample()]]
+
+    def new_url(self) -> str:
+        return f'https://bench.example/{self.rng.getrandbits(64):016x}'